@@ -22,24 +22,25 @@ if you want to install QuSpin on Mac and
 https://quspin.github.io/QuSpin/
 for general documentation on quspin.
 
-We will also use a helper file, tenpy_lattice_adapter.py
-that helps with setting up lattices. This requires another
-open source package, tenpy, which can be installed with
+We will also use the helper files tenpy_lattice_adapter.py
+and native_lattice.py that help with setting up lattices.
+Drawing the lattice requires another open source package,
+tenpy, which can be installed with
 
 pip install physics-tenpy.
+The lattices in native_lattice.py give the same couplings
+as the tenpy lattices, without having to import tenpy.
 """
 
 from quspin.operators import hamiltonian
 from quspin.basis import spin_basis_general
 from tenpy_lattice_adapter import get_qubit_couplings, draw_lattice
-from tenpy.models.lattice import Square
+from native_lattice import Square
+from microcanonical import eigenbasis_diagonal, microcanonical_sweep
+from eigh_cache import eigh_key, get_or_compute
 import numpy as np
 from matplotlib import pyplot as plt
 
-def microcanonical(E,V, E0, variance):
-    rho = V @ np.diag(np.exp(- (E-E0)**2/ variance)) @ V.conj().transpose()
-    return rho/np.trace(rho)
-
 
 for (Lx,Ly) in [(3,3)]:
     print('{}x{}'.format(Lx,Ly))
@@ -53,9 +54,12 @@ for (Lx,Ly) in [(3,3)]:
     lattice = Square(Lx,Ly, None, bc='open')
     couplings = get_qubit_couplings(lattice)
     terms = [[-1.0, coupling[0], coupling[1]] for coupling in couplings]
+    static = [["xx",terms],["yy",terms]]
     basis = spin_basis_general(N)
-    H = hamiltonian([["xx",terms],["yy",terms]],[],basis=basis,dtype=np.complex128)
-    E,V=H.eigh()
+    H = hamiltonian(static,[],basis=basis,dtype=np.complex128)
+    # The eigendecomposition is cached on disk in eigh_cache/, so re-running
+    # this script (e.g. to change a plot) does not diagonalise H again.
+    E,V=get_or_compute(eigh_key(lattice, static, dtype=np.complex128), H.eigh)
 
 
     ################################################################
@@ -68,13 +72,13 @@ for (Lx,Ly) in [(3,3)]:
     order_parameter = (Sx**2 + Sy**2)/N ** 2
     # (The convention used by D,V = np.linalg.eig(H) is that V.conj().transpose() @ H @ V = np.diag(D)))
 
+    # Rotating the order parameter into the eigenbasis once, we only need its
+    # diagonal <k|O|k> to evaluate the microcanonical ensemble at all energies.
+    order_parameter_diagonal = eigenbasis_diagonal(order_parameter, V)
+
     variance = N * 4/3 #Choosing a variance = width^2 of the Gaussian filter.
-    order_parameters = []
-    energy_centers = []
-    for energy_center in np.linspace(min(E),max(E),30): # Sweeping over energy
-        rho = microcanonical(E, V, energy_center, variance)
-        order_parameters.append( np.trace(order_parameter.dot(rho)))
-        energy_centers.append(energy_center)
+    energy_centers = np.linspace(min(E),max(E),30) # Sweeping over energy
+    order_parameters = microcanonical_sweep(E, order_parameter_diagonal, energy_centers, variance)
 
     plt.plot(np.array(energy_centers)/N, order_parameters, 'o', label='{}x{}'.format(Lx,Ly))
     plt.xlabel('Energy Density')
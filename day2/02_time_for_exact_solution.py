@@ -9,10 +9,10 @@ in the same folder.
 from quspin.operators import hamiltonian # Hamiltonians and operators
 from quspin.basis import spin_basis_general
 from tenpy_lattice_adapter import get_qubit_couplings, draw_lattice
-from tenpy.models.lattice import Square
+from native_lattice import Square
 import numpy as np
 from matplotlib import pyplot as plt
-from time import time
+from benchmark_xy import time_stage
 
 Ns = []
 times = []
@@ -27,9 +27,8 @@ for (Lx,Ly) in [(3,3),(5,2),(4,3),(7,2)]:
     basis = spin_basis_general(N, Nup=N//2)
     H = hamiltonian([["xx",terms],["yy",terms]],[],basis=basis,dtype=np.float64)
 
-    t0 = time()
-    E,V=H.eigh()
-    times.append(time()-t0)
+    # Times only the diagonalisation; see benchmark_xy.py for the other stages.
+    times.append(time_stage(H.eigh)['min'])
 
 plt.figure()
 plt.semilogy(Ns, times,'o', label='Time to solution [s]')
@@ -12,78 +12,12 @@ vs high-energy disordered phase as the exact
 diagonalisation-based method in script #01.
 """
 from pytket import Circuit
-from tenpy_lattice_adapter import get_qubit_couplings, draw_lattice
-from tenpy.models.lattice import Square
+from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings, draw_lattice
+from native_lattice import Square
+from xy_circuits import evolve_statevector_batch, XY_step
+from numpy_statevector import order_parameter, xy_energy
 import numpy as np
 from matplotlib import pyplot as plt
-from pytket.extensions.qiskit import tk_to_qiskit
-from qiskit_aer import Aer
-from qiskit.quantum_info import SparsePauliOp, Statevector
-
-def get_pauli_string(N, lst):
-    s = ''
-    for j in range(N):
-        flag = 0
-        for op in lst:
-            if op[1]==j:
-                s = s+op[0]
-                flag = 1
-                break
-        if flag ==0: s = s+'I'
-    return s
-
-def get_statevector(qc, noise_model=None, precision='single'):
-    qc_temp = tk_to_qiskit(qc)
-    qc_temp.save_statevector()
-    sim_statevector = Aer.get_backend('aer_simulator_statevector', precision = precision)
-    sv = sim_statevector.run(qc_temp, noise_model=noise_model, shots=1).result().data()['statevector']
-    return Statevector(sv)
-def XYHamiltonian(couplings):
-    # makes the qiskit.opflow operator that is the Hamiltonian
-    # of the XY model
-    N = max(list(map(max, couplings))) + 1
-
-    coupling = couplings[0]
-    bond_X = [['X', coupling[0]], ['X', coupling[1]]]
-    bond_Y = [['Y', coupling[0]], ['Y', coupling[1]]]
-    H = SparsePauliOp(get_pauli_string(N, bond_X))
-    H = H + SparsePauliOp(get_pauli_string(N, bond_Y))
-    for coupling in couplings[1::]:
-        bond_X = [['X', coupling[0]], ['X', coupling[1]]]
-        bond_Y = [['Y', coupling[0]], ['Y', coupling[1]]]
-        H = H + SparsePauliOp(get_pauli_string(N, bond_X))
-        H = H + SparsePauliOp(get_pauli_string(N, bond_Y))
-    return -H
-
-def Sx(N):
-    # makes the qiskit SparsePauliOperator that is sum of X on N qubits, divided by N
-    one_point_list_z = [[['X', j]] for j in range(N)]
-    a = 0
-    for z in one_point_list_z:
-        a = a + SparsePauliOp(get_pauli_string(N, z))
-    return a / N
-
-def Sy(N):
-    # makes the qiskit SparsePauliOperator that is sum of Y on N qubits, divided by N
-    one_point_list_z = [[['Y', j]] for j in range(N)]
-    a = 0
-    for z in one_point_list_z:
-        a = a + SparsePauliOp(get_pauli_string(N, z))
-    return a / N
-
-def XY_step(dt, couplings, n_layers=1):
-    # 2nd order Trotter step in XY model
-    N = max(list(map(max, couplings))) + 1
-    qc = Circuit(N)
-
-    for t in range(n_layers):
-        for coupling in couplings:
-            qc.YYPhase(dt/2 * 2/np.pi, coupling[0], coupling[1])
-        for coupling in couplings:
-            qc.XXPhase(dt * 2/np.pi, coupling[0], coupling[1])
-        for coupling in couplings:
-            qc.YYPhase(dt/2 * 2/np.pi, coupling[0], coupling[1])
-    return qc
 
 Lx = 4
 Ly = 4
@@ -91,11 +25,12 @@ N = Lx * Ly
 
 lattice = Square(Lx, Ly, None, bc='periodic')
 couplings = get_qubit_couplings(lattice)
+layers = schedule_couplings(couplings)
 
 
 ###########################################################
 ## Note the order of the couplings. It is VERY important ##
-## to manually check your circuits for parallelisation,  ##
+## to check your circuits for parallelisation,           ##
 ## i.e., on a 1D chain, you could choose couplings       ##
 ## bad = [ [0,1], [1,2], [2,3], [3,4], [4,5], ...        ##
 ## This will lead to almost all gate zones being idle    ##
@@ -103,37 +38,48 @@ couplings = get_qubit_couplings(lattice)
 ## For the scenario above, you could choose even-odd,i.e.##
 ## good= [ [0,1], [2,3], [4,5], ..., [1,2], [3,4], ...   ##
 ##                                                       ##
-## The tenpy_lattice_adapter does a reasonable job at    ##
-## parallelisation.                                      ##
+## schedule_couplings from the tenpy_lattice_adapter     ##
+## does this automatically: it splits the couplings into ##
+## as few layers of disjoint couplings as possible.      ##
+## Pass max_gates_per_layer to match the number of gate  ##
+## zones of the device.                                  ##
 ###########################################################
-print(couplings)
+print(layers)
 
 dt = 0.2
 Tmax = 20
 
-energies = []
-converged_order_parameters = []
-for theta in np.linspace(0, np.pi/8,5):
-
+thetas = np.linspace(0, np.pi/8,5)
+preparations = []
+for theta in thetas:
     qc = Circuit(N)
     for j in range(N):
         qc.H(j)
         qc.Ry(theta * 2/np.pi,j)    #Note the non-standard Pytket convention.
-    sv = get_statevector(qc)
-    energies.append(np.real(sv.expectation_value(XYHamiltonian(couplings))))
-    order_parameters = [np.real(sv.expectation_value(Sx(N) ** 2 + Sy(N) ** 2))]
-    ts = [0]
-
-    for t in range(1,Tmax):
-        print('t={}/{}'.format(t,Tmax))
-        qc.append(XY_step(dt, couplings))
-        sv = get_statevector(qc)
-        order_parameters.append( np.real( sv.expectation_value( Sx(N)**2 + Sy(N)**2) ))
-        ts.append(t)
-    converged_order_parameters.append(order_parameters[-1])
-
+    preparations.append(qc)
+
+# All thetas share the same Trotter step, so their statevectors are evolved
+# together as the columns of one array, see evolve_statevector_batch.
+# Each step only simulates the new Trotter step, starting from the
+# statevectors of the previous step.
+order_parameters = []
+ts = []
+for t, states in enumerate(evolve_statevector_batch(preparations, XY_step(dt, layers), Tmax-1)):
+    print('t={}/{}'.format(t,Tmax))
+    # <H> and <Sx^2 + Sy^2> are evaluated directly from the amplitudes,
+    # see numpy_statevector.py. They agree with
+    # sv.expectation_value(XYHamiltonian(couplings)) and
+    # sv.expectation_value(Sx(N)**2 + Sy(N)**2) from xy_circuits.py.
+    if t == 0:
+        energies = xy_energy(states, couplings)
+    order_parameters.append(order_parameter(states))
+    ts.append(t)
+order_parameters = np.array(order_parameters) # Shape (len(ts), len(thetas))
+converged_order_parameters = order_parameters[-1]
+
+for theta, order_parameters_theta in zip(thetas, order_parameters.T):
     plt.figure(0)
-    plt.plot(ts, np.cumsum(order_parameters)/(np.array(ts)+1), 'o-', label='theta = {:.2f}'.format(theta))
+    plt.plot(ts, np.cumsum(order_parameters_theta)/(np.array(ts)+1), 'o-', label='theta = {:.2f}'.format(theta))
     plt.legend(loc='best')
     plt.xlabel('Number of 2nd order Trotter steps, dt = {}'.format(dt))
     plt.ylabel('Time-averaged <Sx^2 + Sy^2>')
@@ -9,6 +9,18 @@ In particular, we will note
 is done properly and
 2) How to deal with different measurement bases.
 
+All circuits are built first, compiled in a single
+get_compiled_circuits call and submitted in chunks
+with process_circuits, instead of one round-trip
+per circuit. As theta only enters the state
+preparation, each (n_steps, basis) circuit is
+compiled only once, as a template with a symbolic
+theta, see use_templates. Compiled circuits are
+cached on disk by compile_cache.py, so re-running
+the script does not compile them again. The handles
+are recorded in the job manifest jobs.sqlite, see
+job_manifest.py.
+
 Unlike the other scripts, we will not execute this
 in real time, but this code can be used as a basis
 that you can copy into your own experiments.
@@ -16,32 +28,42 @@ that you can copy into your own experiments.
 
 
 from pytket import Circuit
-import os
-import pickle
-from tenpy_lattice_adapter import get_qubit_couplings
-from tenpy.models.lattice import Square
+from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings, coupling_layers
+from native_lattice import Square
 import numpy as np
-from pytket.extensions.nexus import NexusBackend, QuantinuumConfig, Nexus
-from pytket.extensions.nexus.exceptions import ResourceFetchFailed
-
-def XY_step(dt, couplings, n_layers=1):
-    # 2nd order Trotter step in XY model
-    N = max(list(map(max, couplings))) + 1
+from sympy import Symbol
+from local_backend import LocalBackend
+from compile_cache import get_compiled_circuits
+from job_manifest import JobManifest
+
+def XY_step(dt, couplings, n_layers=1, max_gates_per_layer=None):
+    # 2nd order Trotter step in XY model.
+    # couplings as returned by get_qubit_couplings are split into layers of disjoint
+    # couplings by schedule_couplings, with at most max_gates_per_layer gates each,
+    # and the gates are emitted layer by layer so that each layer runs in parallel.
+    # The layers returned by schedule_couplings may also be passed directly.
+    layers = coupling_layers(couplings, max_gates_per_layer)
+    N = max(int(np.max(layer)) for layer in layers) + 1
     qc = Circuit(N)
-    for coupling in couplings:
-        qc.YYPhase(dt / 2 * 2 / np.pi, coupling[0], coupling[1])
+    for layer in layers:
+        for coupling in layer:
+            qc.YYPhase(dt / 2 * 2 / np.pi, coupling[0], coupling[1])
 
 
     for t in range(n_layers-1):
-        for coupling in couplings:
-            qc.XXPhase(dt * 2/np.pi, coupling[0], coupling[1])
-        for coupling in couplings:
-            qc.YYPhase(dt * 2/np.pi, coupling[0], coupling[1])
-
-    for coupling in couplings:
-        qc.XXPhase(dt * 2 / np.pi, coupling[0], coupling[1])
-    for coupling in couplings:
-        qc.YYPhase(dt / 2 * 2 / np.pi, coupling[0], coupling[1])
+        for layer in layers:
+            for coupling in layer:
+                qc.XXPhase(dt * 2/np.pi, coupling[0], coupling[1])
+        for layer in layers:
+            for coupling in layer:
+                qc.YYPhase(dt * 2/np.pi, coupling[0], coupling[1])
+
+    for layer in layers:
+        for coupling in layer:
+            qc.XXPhase(dt * 2 / np.pi, coupling[0], coupling[1])
+    for layer in layers:
+        for coupling in layer:
+            qc.YYPhase(dt / 2 * 2 / np.pi, coupling[0], coupling[1])
 
     return qc
 
@@ -50,61 +72,99 @@ Ly = 4
 N=Lx*Ly
 lattice = Square(Lx, Ly, None, bc='periodic')
 couplings = get_qubit_couplings(lattice)
+max_gates_per_layer = None # e.g. the number of gate zones of the device
+layers = schedule_couplings(couplings, max_gates_per_layer=max_gates_per_layer)
 dt = 0.2
 Tmax = 20
 
-machine = 'H1-Emulator'
-emulator_config = QuantinuumConfig(device_name=machine)
-project_name="Microcanonical ExpVal Project"
-try:
-    project = Nexus().get_project_by_name(project_name=project_name)
-except ResourceFetchFailed:
-    project = Nexus().new_project(name=project_name)
-backend = NexusBackend(
-    backend_config=emulator_config,
-    project=project,
-)
+machine = 'H1-Emulator' # or 'local' to simulate the shots offline with the LocalBackend
+if machine == 'local':
+    backend = LocalBackend()
+else:
+    from pytket.extensions.nexus import NexusBackend, QuantinuumConfig, Nexus
+    from pytket.extensions.nexus.exceptions import ResourceFetchFailed
+    emulator_config = QuantinuumConfig(device_name=machine)
+    project_name="Microcanonical ExpVal Project"
+    try:
+        project = Nexus().get_project_by_name(project_name=project_name)
+    except ResourceFetchFailed:
+        project = Nexus().new_project(name=project_name)
+    backend = NexusBackend(
+        backend_config=emulator_config,
+        project=project,
+    )
 n_shots = 100
+chunk_size = 50 # circuits per process_circuits request
 
 thetas = [0, 0.4, 0.6]
 
-for theta in thetas:
-    for n_steps in range(1, Tmax):
+def measured_circuit(theta, n_steps, basis):
+    # Trotter circuit for the initial angle theta, measured in the X or Y basis.
+    # theta may be a sympy symbol, to build a template for all thetas.
+    qc = Circuit(N)
+    for j in range(N):
+        qc.H(j)
+        qc.Ry(theta * 2 / np.pi, j)
+    qc.append(XY_step(dt, layers, n_layers=n_steps))
 
-        qc = Circuit(N)
+    if basis == 'X':
         for j in range(N):
             qc.H(j)
-            qc.Ry(theta * 2 / np.pi, j)
-        qc.append(XY_step(dt, couplings, n_layers=n_steps))
-
-        for basis in ['X','Y']:
-            if basis == 'X':
-                for j in range(N):
-                    qc.H(j)
-            elif basis == 'Y':
-                for j in range(N):
-                    qc.Sdg(j)
-                    qc.H(j)
-
-            qc.measure_all()
-            id = 'XY_theta={:.2f}_n={}_basis={}'.format(theta, n_steps, basis)
-            qc.name = id
-            print(id)
-
-            compiled_circuit = backend.get_compiled_circuit(qc, optimisation_level=1)
-            handle = backend.process_circuit(compiled_circuit,n_shots=n_shots)
-            data = {
-                'Lx': Lx,
-                'Ly': Ly,
-                'n_steps': n_steps,
-                'dt': dt,
-                'handle': handle,
-                'basis': basis,
-            }
-
-            filename = 'handles/{}.pkl'.format(id)
-            os.makedirs('handles', mode=0o777, exist_ok=True)
-            with open(filename, 'wb') as file:
-                pickle.dump(data, file)
-
-print('done')
\ No newline at end of file
+    elif basis == 'Y':
+        for j in range(N):
+            qc.Sdg(j)
+            qc.H(j)
+
+    qc.measure_all()
+    return qc
+
+# theta only enters the state preparation, so with use_templates each
+# (n_steps, basis) circuit is compiled once with a symbol for theta,
+# and the thetas are substituted into the compiled circuits.
+use_templates = True
+theta_symbol = Symbol('theta')
+keys = [(n_steps, basis) for n_steps in range(1, Tmax) for basis in ['X','Y']]
+if use_templates:
+    templates = [measured_circuit(theta_symbol, n_steps, basis) for n_steps, basis in keys]
+    compiled_templates = dict(zip(keys, get_compiled_circuits(backend, templates, optimisation_level=1)))
+    print('compiled {} templates'.format(len(templates)))
+
+# First build all circuits that are not in the job manifest yet, or whose
+# job failed, so that after a crash the script can simply be run again, ...
+manifest = JobManifest('jobs.sqlite')
+ids = []
+circuits = []
+metadata = []
+for theta in thetas:
+    for n_steps, basis in keys:
+        key = {'theta': theta, 'n_steps': n_steps, 'basis': basis, 'Lx': Lx, 'Ly': Ly, 'dt': dt}
+        if manifest.status(key) in ('submitted', 'done'):
+            continue
+        id = 'XY_theta={:.2f}_n={}_basis={}'.format(theta, n_steps, basis)
+        if use_templates:
+            qc = compiled_templates[(n_steps, basis)].copy()
+            qc.symbol_substitution({theta_symbol: theta})
+        else:
+            qc = measured_circuit(theta, n_steps, basis)
+        qc.name = id
+        ids.append(id)
+        circuits.append(qc)
+        metadata.append(key)
+
+# ... then compile them in one call (the templates are compiled already),
+# only circuits that are not in the compilation cache are compiled ...
+if use_templates:
+    compiled_circuits = circuits
+else:
+    compiled_circuits = get_compiled_circuits(backend, circuits, optimisation_level=1)
+    print('compiled {} circuits'.format(len(compiled_circuits)))
+
+# ... and submit them in chunks, recording the handles of each chunk in the
+# job manifest as soon as it is submitted.
+for start in range(0, len(compiled_circuits), chunk_size):
+    chunk = slice(start, start + chunk_size)
+    handles = backend.process_circuits(compiled_circuits[chunk], n_shots=n_shots)
+    manifest.add_jobs(zip(metadata[chunk], handles))
+    print('submitted {} of {} circuits'.format(min(start + chunk_size, len(ids)), len(ids)))
+
+print('done')
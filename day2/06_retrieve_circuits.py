@@ -3,94 +3,69 @@ In this script, we will retrieve shots for the circuits
 that encode the diagonal ensemble in the XY-model
 at different energies, turn the counts into
 expectation values and error bars and then save
-those values to disk.
+those values to disk, as one table data/XY_results
+for all thetas and times.
 
 We will not execute this script in real time.
 """
 
-import os
-import pickle
-import numpy as np
-from pytket.extensions.nexus import NexusBackend, QuantinuumConfig, Nexus
-from pytket.extensions.nexus.exceptions import ResourceFetchFailed
-
-def moments_from_counts(counts, moment=2):
-    #1 is mean <X>
-    #2 is structure factor <X^2>
-    mean = 0
-
-    total_shots = 0
-    for bitstring, frequency in counts.items():
-        s = sum([1-2*i for i in bitstring])/len(bitstring)
-        mean = mean + s**moment * frequency
-        total_shots = total_shots + frequency
-    mean = mean/total_shots
-
-    if total_shots > 1:
-        stdev = 0
-        for bitstring, frequency in counts.items():
-            s = sum([1-2*i for i in bitstring])/len(bitstring)
-            stdev = stdev + (s**moment - mean)**2 * frequency
-        stdev = np.sqrt(stdev/(total_shots-1))
-        standard_error = stdev / np.sqrt(total_shots)
-
-        return mean, standard_error
-    return mean
+from local_backend import LocalBackend
+from shot_analysis import moments_from_readouts
+from counts_store import fetch_counts
+from job_manifest import JobManifest
+from results_table import write_table
 
 Lx = 4
 Ly = 4
 N=Lx*Ly
 dt = 0.2
-Tmax = 20
 
-machine = 'H1-Emulator'
-emulator_config = QuantinuumConfig(device_name=machine)
-project_name="Microcanonical ExpVal Project"
-try:
-    project = Nexus().get_project_by_name(project_name=project_name)
-except ResourceFetchFailed:
-    project = Nexus().new_project(name=project_name)
-backend = NexusBackend(
-    backend_config=emulator_config,
-    project=project,
-)
+machine = 'H1-Emulator' # or 'local' to simulate the shots offline with the LocalBackend
+if machine == 'local':
+    backend = LocalBackend()
+else:
+    from pytket.extensions.nexus import NexusBackend, QuantinuumConfig, Nexus
+    from pytket.extensions.nexus.exceptions import ResourceFetchFailed
+    emulator_config = QuantinuumConfig(device_name=machine)
+    project_name="Microcanonical ExpVal Project"
+    try:
+        project = Nexus().get_project_by_name(project_name=project_name)
+    except ResourceFetchFailed:
+        project = Nexus().new_project(name=project_name)
+    backend = NexusBackend(
+        backend_config=emulator_config,
+        project=project,
+    )
 n_shots = 100
 
-thetas = [0, 0.4, 0.6]
-for theta in thetas:
-    ts = []
-    observables = {'SX^2':[], 'SY^2':[]}
-    errorbars   = {'SX^2':[], 'SY^2':[]}
-    for n_steps in range(1, Tmax):
-
-        for basis in ['X','Y']:
-            id = 'XY_theta={:.2f}_n={}_basis={}'.format(theta, n_steps, basis)
-            filename = 'handles/{}.pkl'.format(id)
-
-            with open(filename, 'rb') as file:
-                data = pickle.load(file)
-            result = backend.get_result(data['handle'])
-            counts = result.get_counts()
-
-            S2 = moments_from_counts(counts)
-            observables['S{}^2'.format(basis)].append(S2[0])
-            errorbars['S{}^2'.format(basis)].append(S2[1])
-        ts.append(n_steps*dt)
+refresh = False # fetch all results from the backend again, even if they are stored locally
 
-    order_parameters = np.array(observables['SX^2']) + np.array(observables['SY^2'] )
-    order_parameter_errorbars =  np.array(errorbars['SX^2']) + np.array(errorbars['SY^2'] )
-    data = {
-        'order_parameters': order_parameters,
-        'order_parameter_errorbars': order_parameter_errorbars,
-        'theta':theta,
-        'Lx':Lx,
-        'Ly':Ly,
-        'dt':dt,
-        'ts':ts
-    }
+# Fetch the counts of all jobs at once, in chunks of get_results calls in parallel threads.
+# They are kept in counts_store/, so re-running the analysis does not contact the backend.
+# Failed jobs are left out; script #05 submits them again.
+manifest = JobManifest('jobs.sqlite')
+jobs = manifest.jobs(status=['submitted', 'done'], Lx=Lx, Ly=Ly, dt=dt)
+counts = fetch_counts(backend, [job['handle'] for job in jobs], refresh=refresh)
+for job, (readouts, weights) in zip(jobs, counts):
+    job['S2'] = [float(value) for value in moments_from_readouts(readouts, weights, (2,))[2]]
+    if job['status'] != 'done':
+        manifest.set_status(job, 'done', result=job['S2'])
 
-    filename = 'data/XY_theta={:.2f}.pkl'.format(theta)
-    os.makedirs('data', mode=0o777, exist_ok=True)
-    with open(filename, 'wb') as file:
-        pickle.dump(data, file)
-print('done')
\ No newline at end of file
+# One row per (theta, n_steps) in a single results table, see results_table.py.
+rows = {}
+for job in jobs:
+    row = rows.setdefault((job['theta'], job['n_steps']), {
+        'theta': job['theta'],
+        'Lx': Lx,
+        'Ly': Ly,
+        'dt': dt,
+        'n_steps': job['n_steps'],
+        't': job['n_steps']*dt,
+    })
+    row['S{}^2'.format(job['basis'])] = job['S2']
+rows = [row for row in rows.values() if 'SX^2' in row and 'SY^2' in row]
+columns = {name: [row[name] for row in rows] for name in ['theta', 'Lx', 'Ly', 'dt', 'n_steps', 't']}
+columns['order_parameter'] = [row['SX^2'][0] + row['SY^2'][0] for row in rows]
+columns['order_parameter_error'] = [row['SX^2'][1] + row['SY^2'][1] for row in rows]
+write_table('data/XY_results', columns)
+print('done')
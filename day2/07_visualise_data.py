@@ -8,16 +8,15 @@ lower (higher) energies?
 """
 
 
-import pickle
+import numpy as np
 from matplotlib import pyplot as plt
+from results_table import load_table, select
 
-thetas = [0, 0.4, 0.6]
-for theta in thetas:
-    filename = 'data/XY_theta={:.2f}.pkl'.format(theta)
-    with open(filename, 'rb') as file:
-        data = pickle.load(file)
+table = load_table('data/XY_results')
+for theta in np.unique(table['theta']):
+    data = select(table, theta=theta)
 
-    plt.errorbar(data['ts'], data['order_parameters'],data['order_parameter_errorbars'], label='theta = {:.2f}'.format(theta))
+    plt.errorbar(data['t'], data['order_parameter'],data['order_parameter_error'], label='theta = {:.2f}'.format(theta))
 
 plt.legend(loc='best')
 plt.title('4x4 XY Model thermalisation from quantum circuits')
@@ -0,0 +1,140 @@
+"""
+An asyncio pipeline that compiles, submits, polls and analyses the
+circuits of a sweep concurrently, instead of compiling and submitting
+everything in script #05 and fetching it later in script #06.
+
+Each circuit goes through compile -> submit -> poll -> get_result ->
+analyse as its own task. Compilation runs one circuit at a time, so
+circuit k+1 compiles while circuit k uploads, at most max_uploads
+submissions run at once and at most max_in_flight circuits are
+between compilation and result. circuit_status is polled with
+exponential backoff. Every backend call runs in a thread and is
+retried with exponential backoff when it raises, and a circuit that
+still fails is reported as its exception without stopping the rest.
+
+The backend calls are those of any pytket Backend, so the pipeline
+can be tried offline with LocalBackend(queue_time=...), e.g.
+
+results = run_pipeline(LocalBackend(queue_time=2), circuits, n_shots=100,
+                       analyse=lambda result: moments_from_counts(result.get_counts()))
+
+Note that a submission that fails after reaching the backend is
+submitted again when retried.
+"""
+import asyncio
+from pytket.backends import CircuitNotValidError, StatusEnum
+from compile_cache import get_compiled_circuits
+
+
+async def _call(function, *args, retries=3, backoff=1.0, **kwargs):
+    # function(*args, **kwargs) in a thread, retried up to retries times
+    # after waiting backoff, 2 backoff, 4 backoff, ... seconds. Invalid circuits are not retried.
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.to_thread(function, *args, **kwargs)
+        except CircuitNotValidError:
+            raise
+        except Exception as error:
+            if attempt == retries:
+                raise
+            print('Retrying {} after {!r}'.format(getattr(function, '__name__', function), error))
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+
+async def _run_circuit(backend, circuit, n_shots, analyse, limits, optimisation_level, retries, backoff,
+                       poll_interval, max_poll_interval):
+    call = {'retries': retries, 'backoff': backoff}
+    async with limits['in_flight']:
+        async with limits['compile']:
+            compiled = (await _call(get_compiled_circuits, backend, [circuit], optimisation_level, **call))[0]
+        async with limits['upload']:
+            handle = await _call(backend.process_circuit, compiled, n_shots=n_shots, **call)
+        delay = poll_interval
+        while True:
+            status = await _call(backend.circuit_status, handle, **call)
+            if status.status == StatusEnum.COMPLETED:
+                break
+            if status.status in (StatusEnum.ERROR, StatusEnum.CANCELLED):
+                raise RuntimeError('Circuit {} {}: {}'.format(circuit.name, status.status.name, status.message))
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, max_poll_interval)
+        result = await _call(backend.get_result, handle, **call)
+    return analyse(result) if analyse is not None else result
+
+
+async def pipeline(backend, circuits, n_shots, analyse=None, max_in_flight=8, max_uploads=2, optimisation_level=1,
+                   retries=3, backoff=1.0, poll_interval=1.0, max_poll_interval=60.0):
+    # Yields (index, value) for each of the circuits as soon as it is done, where value
+    # is analyse(result) (or the BackendResult if analyse is None), or the exception
+    # if the circuit failed for good.
+    limits = {
+        'in_flight': asyncio.Semaphore(max_in_flight),
+        'compile': asyncio.Semaphore(1),
+        'upload': asyncio.Semaphore(max_uploads),
+    }
+
+    async def run(index, circuit):
+        try:
+            return index, await _run_circuit(backend, circuit, n_shots, analyse, limits, optimisation_level,
+                                             retries, backoff, poll_interval, max_poll_interval)
+        except Exception as error:
+            return index, error
+
+    tasks = [asyncio.create_task(run(index, circuit)) for index, circuit in enumerate(circuits)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def run_pipeline(backend, circuits, n_shots, analyse=None, **kwargs):
+    # Runs the pipeline to the end and returns the values in the order of circuits,
+    # see pipeline for the keyword arguments.
+    async def collect():
+        values = [None] * len(circuits)
+        async for index, value in pipeline(backend, circuits, n_shots, analyse, **kwargs):
+            print('Finished {}'.format(circuits[index].name))
+            values[index] = value
+        return values
+    return asyncio.run(collect())
+
+
+if __name__ == '__main__':
+    import time
+    import numpy as np
+    from pytket import Circuit
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings
+    from xy_circuits import XY_step
+    from local_backend import LocalBackend
+    from shot_analysis import moments_from_counts
+
+    Lx, Ly = 3, 3
+    N = Lx * Ly
+    dt = 0.2
+    theta = 0.4
+    layers = schedule_couplings(get_qubit_couplings(Square(Lx, Ly, None, bc='periodic')))
+    circuits = []
+    for n_steps in range(1, 6):
+        for basis in ['X', 'Y']:
+            qc = Circuit(N)
+            for j in range(N):
+                qc.H(j)
+                qc.Ry(theta * 2 / np.pi, j)
+            qc.append(XY_step(dt, layers, n_layers=n_steps))
+            for j in range(N):
+                if basis == 'Y':
+                    qc.Sdg(j)
+                qc.H(j)
+            qc.measure_all()
+            qc.name = 'XY_theta={:.2f}_n={}_basis={}'.format(theta, n_steps, basis)
+            circuits.append(qc)
+
+    start = time.time()
+    values = run_pipeline(LocalBackend(queue_time=2.0), circuits, n_shots=1000,
+                          analyse=lambda result: moments_from_counts(result.get_counts()), poll_interval=0.5)
+    print('{} circuits in {:.1f}s'.format(len(circuits), time.time() - start))
+    for qc, value in zip(circuits, values):
+        print(qc.name, value)
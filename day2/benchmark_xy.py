@@ -0,0 +1,185 @@
+"""
+Benchmarks of the individual stages of scripts #02 and #04:
+lattice build, operator build, exact diagonalisation, Trotter step
+construction, statevector simulation and expectation value.
+
+Each stage is timed separately, with warm-up runs that are not
+recorded and a number of repeats. The peak memory of each stage is
+measured with tracemalloc in one more, untimed call, so it counts only
+what the stage itself allocates through Python and numpy (not e.g. the
+buffers of C++ libraries like Aer), and not the imports of its warm-up.
+Results are written as JSON and can be compared against a stored
+baseline to flag regressions, e.g.
+
+python benchmark_xy.py --sizes 3x3 4x3 --output baseline.json
+python benchmark_xy.py --sizes 3x3 4x3 --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from time import perf_counter, strftime
+import numpy as np
+
+STAGES = ['lattice', 'operator', 'eigh', 'trotter_step', 'statevector', 'expectation']
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far (ru_maxrss is in kB on Linux, bytes on macOS),
+    # or nan where the resource module does not exist, e.g. on Windows.
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+def peak_memory_mb(run, args=()):
+    # Peak memory allocated through Python and numpy during run(*args), from tracemalloc.
+    tracemalloc.start()
+    try:
+        run(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+
+def time_stage(run, setup=None, repeats=3, warmup=1, memory=True):
+    # Times run(*setup()) repeats times after warmup untimed calls. setup is
+    # called before every call and not timed. Returns a dict with all times,
+    # their minimum and median, the peak memory of the stage from one more
+    # untimed call (if memory, otherwise nan) and the peak RSS of the process so far.
+    times = []
+    for i in range(warmup + repeats):
+        args = setup() if setup is not None else ()
+        t0 = perf_counter()
+        run(*args)
+        if i >= warmup:
+            times.append(perf_counter() - t0)
+    return {
+        'times': times,
+        'min': min(times),
+        'median': float(np.median(times)),
+        'peak_memory_mb': peak_memory_mb(run, setup() if setup is not None else ()) if memory else float('nan'),
+        'process_peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _stage_functions(Lx, Ly, dt=0.2):
+    # (run, setup) for each stage on an Lx x Ly periodic square lattice. Heavy packages
+    # are only imported here, so that e.g. the lattice stage runs without qiskit.
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings
+    N = Lx * Ly
+    couplings = get_qubit_couplings(Square(Lx, Ly, None, bc='periodic'))
+    layers = schedule_couplings(couplings)
+
+    def lattice():
+        get_qubit_couplings(Square(Lx, Ly, None, bc='periodic'))
+
+    def operator():
+        from quspin.operators import hamiltonian
+        from quspin.basis import spin_basis_general
+        terms = [[-1.0, coupling[0], coupling[1]] for coupling in couplings]
+        basis = spin_basis_general(N, Nup=N // 2)
+        return hamiltonian([["xx", terms], ["yy", terms]], [], basis=basis, dtype=np.float64,
+                           check_herm=False, check_symm=False, check_pcon=False)
+
+    def circuit():
+        from pytket import Circuit
+        from xy_circuits import XY_step
+        qc = Circuit(N)
+        for j in range(N):
+            qc.H(j)
+        qc.append(XY_step(dt, layers))
+        return qc
+
+    def trotter_step():
+        from xy_circuits import XY_step
+        XY_step(dt, layers)
+
+    def statevector(qc):
+        from xy_circuits import get_statevector
+        return get_statevector(qc)
+
+    def expectation(sv):
+        from numpy_statevector import order_parameter, xy_energy
+        order_parameter(sv)
+        xy_energy(sv, couplings)
+
+    return {
+        'lattice': (lattice, None),
+        'operator': (operator, None),
+        'eigh': (lambda H: H.eigh(), lambda: (operator(),)),
+        'trotter_step': (trotter_step, None),
+        'statevector': (statevector, lambda: (circuit(),)),
+        'expectation': (expectation, lambda: (statevector(circuit()),)),
+    }
+
+
+def run_benchmarks(sizes, stages=STAGES, repeats=3, warmup=1):
+    # Runs the stages for all (Lx, Ly) in sizes, in order of increasing size.
+    results = []
+    for Lx, Ly in sorted(sizes, key=lambda size: size[0] * size[1]):
+        functions = _stage_functions(Lx, Ly)
+        for stage in stages:
+            run, setup = functions[stage]
+            result = time_stage(run, setup, repeats=repeats, warmup=warmup)
+            result.update({'stage': stage, 'Lx': Lx, 'Ly': Ly, 'N': Lx * Ly})
+            print('{:>12} {}x{}: min {:.3e}s, median {:.3e}s, peak memory {:.1f} MB'.format(
+                stage, Lx, Ly, result['min'], result['median'], result['peak_memory_mb']))
+            results.append(result)
+    return {
+        'meta': {
+            'date': strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeats': repeats,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=1.2):
+    # Returns the stages whose minimum time grew by more than threshold
+    # relative to the baseline, as a list of (stage, Lx, Ly, ratio).
+    reference = {(r['stage'], r['Lx'], r['Ly']): r['min'] for r in baseline['results']}
+    regressions = []
+    for r in results['results']:
+        key = (r['stage'], r['Lx'], r['Ly'])
+        if key in reference and r['min'] > threshold * reference[key]:
+            regressions.append(key + (r['min'] / reference[key],))
+    return regressions
+
+
+def _size(text):
+    Lx, Ly = text.lower().split('x')
+    return int(Lx), int(Ly)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=_size, nargs='+', default=[(3, 3), (4, 3)], help='lattice sizes as LxxLy')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='flag stages slower than threshold times the baseline')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeats, args.warmup)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for stage, Lx, Ly, ratio in regressions:
+            print('REGRESSION {} {}x{}: {:.2f}x slower than baseline'.format(stage, Lx, Ly, ratio))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,108 @@
+"""
+A persistent on-disk cache of compiled circuits, so that re-running
+script #05, e.g. after a partially failed submission, does not
+compile the same Trotter circuits again.
+
+Each entry is a JSON file with the Circuit.to_dict() of the compiled
+circuit, named by a hash of the uncompiled circuit, the backend, the
+optimisation level and the pytket version. Entries are also kept in
+memory, so repeated lookups in one session do not touch the disk.
+When the cache grows beyond max_bytes, the least recently used
+entries are removed (see disk_cache.py).
+
+compiled_circuits = get_compiled_circuits(backend, circuits, optimisation_level=1)
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pytket
+from pytket import Circuit
+from disk_cache import atomic_file, evict, touch
+
+CACHE_DIR = 'compile_cache'
+MAX_BYTES = 1024 ** 3
+MEMO_SIZE = 1024
+
+_memo = OrderedDict()
+
+
+def backend_name(backend):
+    # Identifies the backend and its device, e.g. NexusBackend with its QuantinuumConfig,
+    # and the device name, version and gate set from its backend_info where available,
+    # so that a change of device or of its native gates does not reuse old compilations.
+    try:
+        info = backend.backend_info
+    except Exception:  # e.g. a backend that needs a connection to describe its device.
+        info = None
+    device = None
+    if info is not None:
+        device = {
+            'device_name': info.device_name,
+            'version': info.version,
+            'gate_set': sorted(op.name for op in info.gate_set),
+        }
+    return '{}({!r}, {})'.format(type(backend).__name__, getattr(backend, 'backend_config', None),
+                                 json.dumps(device, sort_keys=True))
+
+
+def compile_key(circuit, backend, optimisation_level):
+    # Hash identifying the compilation of circuit for backend. The name of
+    # the circuit is left out, so that equal circuits share an entry.
+    circuit_dict = circuit.to_dict()
+    circuit_dict.pop('name', None)
+    description = {
+        'circuit': circuit_dict,
+        'backend': backend_name(backend),
+        'optimisation_level': optimisation_level,
+        'pytket': pytket.__version__,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _remember(key, circuit_dict):
+    _memo[key] = circuit_dict
+    _memo.move_to_end(key)
+    while len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+
+
+def load(key, cache_dir=CACHE_DIR):
+    # Returns the compiled circuit for key, or None if it is not cached.
+    if key not in _memo:
+        path = os.path.join(cache_dir, key + '.json')
+        try:
+            with open(path) as file:
+                _remember(key, json.load(file))
+        except FileNotFoundError:
+            return None
+        touch(path)
+    else:
+        _memo.move_to_end(key)
+    return Circuit.from_dict(_memo[key])
+
+
+def store(key, circuit, cache_dir=CACHE_DIR):
+    # Writes the compiled circuit for key, atomically (see disk_cache.py).
+    circuit_dict = circuit.to_dict()
+    _remember(key, circuit_dict)
+    with atomic_file(os.path.join(cache_dir, key + '.json'), 'w') as file:
+        json.dump(circuit_dict, file)
+
+
+def get_compiled_circuits(backend, circuits, optimisation_level=2, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    # Like backend.get_compiled_circuits, but returns cached compilations where
+    # possible and compiles all other circuits in one call to the backend.
+    keys = [compile_key(circuit, backend, optimisation_level) for circuit in circuits]
+    compiled = [load(key, cache_dir) for key in keys]
+    missing = [i for i, circuit in enumerate(compiled) if circuit is None]
+    if missing:
+        new = backend.get_compiled_circuits([circuits[i] for i in missing], optimisation_level=optimisation_level)
+        for i, circuit in zip(missing, new):
+            store(keys[i], circuit, cache_dir)
+            compiled[i] = circuit
+        evict(cache_dir, max_bytes, keep=set(keys), suffix='.json')
+    for circuit, original in zip(compiled, circuits):
+        if original.name is not None:
+            circuit.name = original.name
+    return compiled
@@ -0,0 +1,95 @@
+"""
+A persistent local store of measured counts, keyed by result handle,
+so that re-running the analysis of script #06, e.g. with another
+estimator, reads the counts from disk instead of the backend.
+
+Results that are not stored yet (or all, with refresh=True) are
+fetched with backend.get_results in chunks, several chunks at once
+in a thread pool, so that the first fetch is not limited by the
+round-trip latency of one get_result per circuit. Each entry is an
+.npz file with the distinct readouts bit-packed into rows of the
+smallest little-endian unsigned words that hold them (uint8 up to 8
+bits, ..., uint64 up to 64 bits, several uint64 words beyond; bit j of
+a readout is bit j % 8 of byte j // 8 of the row) and their counts.
+A readout of n_bits bits takes ceil(n_bits / 8) bytes rounded up to
+the word size instead of n_bits bytes. They are unpacked on loading
+into the (n_outcomes, n_bits) uint8 array and counts used by
+shot_analysis.py. Entries written before bit-packing, with the
+unpacked readouts, are read as well.
+
+readouts, counts = fetch_counts(backend, handles)[0]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import numpy as np
+from disk_cache import atomic_file
+from shot_analysis import counts_to_arrays
+
+STORE_DIR = 'counts_store'
+
+
+def pack_readouts(readouts):
+    # (n, n_bits) array of 0/1 -> (n, n_words) array of the smallest unsigned
+    # words that hold n_bits bits, i.e. uint8, uint16, uint32 or uint64 words.
+    readouts = np.asarray(readouts, dtype=np.uint8)
+    n_bytes = -(-readouts.shape[1] // 8)
+    word_size = next(size for size in (1, 2, 4, 8) if size >= min(n_bytes, 8))
+    n_words = max(1, -(-n_bytes // word_size))
+    packed = np.zeros((len(readouts), word_size * n_words), dtype=np.uint8)
+    packed[:, :n_bytes] = np.packbits(readouts, axis=1, bitorder='little')
+    return packed.view('<u{}'.format(word_size))
+
+
+def unpack_readouts(packed, n_bits):
+    # Inverse of pack_readouts, for any word size.
+    packed = np.asarray(packed)
+    packed = np.ascontiguousarray(packed, dtype=packed.dtype.newbyteorder('<'))
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=n_bits, bitorder='little')
+
+
+def _filename(handle, store_dir):
+    return os.path.join(store_dir, hashlib.sha256(str(handle).encode()).hexdigest()[:32] + '.npz')
+
+
+def load_counts(handle, store_dir=STORE_DIR):
+    # Returns (readouts, counts) stored for handle, or None if it is not stored.
+    try:
+        with np.load(_filename(handle, store_dir)) as data:
+            if 'packed' not in data:  # Written before bit-packing.
+                return data['readouts'], data['counts']
+            return unpack_readouts(data['packed'], int(data['n_bits'])), data['counts']
+    except FileNotFoundError:
+        return None
+
+
+def store_counts(handle, readouts, counts, store_dir=STORE_DIR):
+    # Writes the counts for handle, atomically (see disk_cache.py).
+    with atomic_file(_filename(handle, store_dir)) as file:
+        np.savez(file, packed=pack_readouts(readouts), n_bits=readouts.shape[1], counts=counts, handle=str(handle))
+
+
+def _fetch_chunk(backend, handles, store_dir):
+    fetched = []
+    for handle, result in zip(handles, backend.get_results(handles)):
+        readouts, counts = counts_to_arrays(result.get_counts())
+        store_counts(handle, readouts, counts, store_dir)
+        fetched.append((readouts, counts))
+    return fetched
+
+
+def fetch_counts(backend, handles, store_dir=STORE_DIR, chunk_size=20, max_workers=8, refresh=False):
+    # Returns (readouts, counts) for each of the handles, from the store where possible.
+    # The other results are fetched in chunks of chunk_size handles by max_workers threads
+    # and stored. With refresh=True all results are fetched again.
+    stored = [None if refresh else load_counts(handle, store_dir) for handle in handles]
+    missing = [i for i, counts in enumerate(stored) if counts is None]
+    chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            fetched = pool.map(lambda chunk: _fetch_chunk(backend, [handles[i] for i in chunk], store_dir), chunks)
+            for chunk, counts in zip(chunks, fetched):
+                for i, c in zip(chunk, counts):
+                    stored[i] = c
+        print('fetched {} of {} results'.format(len(missing), len(handles)))
+    return stored
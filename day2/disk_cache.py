@@ -0,0 +1,108 @@
+"""
+Plumbing shared by the on-disk stores: atomic writes of files and
+directories (compile_cache.py, eigh_cache.py, counts_store.py,
+results_table.py) and least recently used eviction of cache entries
+(compile_cache.py, eigh_cache.py).
+
+An entry is written under a temporary name in the same directory
+first and then moved into place, so readers never see a partial entry,
+e.g.
+
+with atomic_file('compile_cache/<key>.json', 'w') as file:
+    json.dump(circuit_dict, file)
+
+An entry of a cache directory is a file or a directory named by its
+key and a suffix, e.g. <key>.json or <key>/. Entries are touched on
+every access, so their modification times order them by last use.
+Names starting with '.' are writes in progress and are left alone.
+"""
+from contextlib import contextmanager
+import os
+import shutil
+import tempfile
+
+
+@contextmanager
+def atomic_file(path, mode='wb'):
+    # Yields a temporary file opened with mode, which replaces path when the block
+    # exits without an exception and is removed otherwise.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.{}-'.format(os.path.basename(path)), dir=directory)
+    try:
+        with os.fdopen(fd, mode) as file:
+            yield file
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_directory(path, replace=False):
+    # Yields the path of a temporary directory, which is moved to path when the block
+    # exits without an exception and is removed otherwise. If path exists already,
+    # it is replaced if replace, and otherwise kept (e.g. stored by somebody else
+    # in the meantime) and the new directory is discarded.
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.{}-'.format(os.path.basename(path)), dir=parent)
+    os.chmod(tmp, 0o755)
+    try:
+        yield tmp
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if replace and os.path.exists(path):
+        old = tempfile.mkdtemp(prefix='.{}-old-'.format(os.path.basename(path)), dir=parent)
+        os.rename(path, os.path.join(old, 'entry'))
+        os.rename(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        return
+    try:
+        os.rename(tmp, path)
+    except OSError:  # Stored by somebody else in the meantime.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def entry_size(path):
+    # Size in bytes of a file, or of the files in a directory.
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def touch(path):
+    # Marks the entry at path as used now.
+    os.utime(path)
+
+
+def evict(cache_dir, max_bytes, keep=(), suffix=''):
+    # Removes the least recently used entries of cache_dir until it fits into
+    # max_bytes. The entries with a key in keep are never removed.
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith('.') or not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.path.getmtime(path), entry_size(path), name[:len(name) - len(suffix)], path))
+        except FileNotFoundError:  # Removed by somebody else in the meantime.
+            pass
+    total = sum(size for _, size, _, _ in entries)
+    for _, size, key, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
@@ -0,0 +1,69 @@
+"""
+A persistent on-disk cache of eigendecompositions, so that re-running
+e.g. script #01 after changing a plot does not repeat H.eigh().
+
+Each entry is a directory named by a hash of the Hamiltonian
+(lattice, boundary conditions, quspin static list of operator strings,
+sites and coefficients, symmetry sector, dtype),
+holding E.npy and V.npy. Entries are loaded with mmap_mode='r', so
+eigenvectors are only paged in from disk when they are used.
+When the cache grows beyond max_bytes, the least recently used
+entries are removed (see disk_cache.py).
+
+E, V = get_or_compute(eigh_key(lattice, static, dtype=np.complex128), H.eigh)
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from disk_cache import atomic_directory, evict, touch
+
+CACHE_DIR = 'eigh_cache'
+MAX_BYTES = 8 * 1024 ** 3
+
+
+def eigh_key(lattice, static, sector=None, dtype=np.float64):
+    # Hash identifying the Hamiltonian with the quspin static list static, e.g.
+    # [['xx', [[J, i, j], ...]], ['yy', [[J, i, j], ...]]], on the given lattice,
+    # restricted to the symmetry sector (e.g. {'Nup': 8}), with the given dtype.
+    description = {
+        'lattice': type(lattice).__name__,
+        'Ls': [int(L) for L in lattice.Ls],
+        'bc': [bool(bc) for bc in lattice.bc],
+        'static': [[str(operator), np.asarray(terms).tolist()] for operator, terms in static],
+        'sector': sector,
+        'dtype': np.dtype(dtype).str,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load(key, cache_dir=CACHE_DIR):
+    # Returns the memory-mapped (E, V) for key, or None if it is not cached.
+    path = os.path.join(cache_dir, key)
+    try:
+        E = np.load(os.path.join(path, 'E.npy'), mmap_mode='r')
+        V = np.load(os.path.join(path, 'V.npy'), mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    touch(path)
+    return E, V
+
+
+def store(key, E, V, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    # Writes (E, V) for key, atomically (see disk_cache.py), and evicts old entries if needed.
+    with atomic_directory(os.path.join(cache_dir, key)) as tmp:
+        np.save(os.path.join(tmp, 'E.npy'), E)
+        np.save(os.path.join(tmp, 'V.npy'), V)
+    evict(cache_dir, max_bytes, keep={key})
+
+
+def get_or_compute(key, compute, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    # Returns the cached (E, V) for key, or calls compute() -> (E, V), stores
+    # the result and returns it memory-mapped from the cache.
+    cached = load(key, cache_dir)
+    if cached is not None:
+        return cached
+    E, V = compute()
+    store(key, E, V, cache_dir, max_bytes)
+    cached = load(key, cache_dir)
+    return cached if cached is not None else (E, V)
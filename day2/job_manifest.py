@@ -0,0 +1,112 @@
+"""
+A single SQLite manifest of the submitted circuits of a sweep,
+instead of one pickled handle file per circuit (scripts #05, #06).
+
+Each job is keyed by (theta, n_steps, basis, Lx, Ly, dt) and holds
+the serialised ResultHandle, its status ('submitted', 'done' or
+'failed'), the submission and last update times and a result, e.g.
+the measured moments or the path of the stored counts. Every write
+is a transaction, so an interrupted sweep leaves a consistent
+manifest and can resume by skipping the jobs that are already in it.
+
+manifest = JobManifest('jobs.sqlite')
+manifest.add_jobs([(key, handle) for key, handle in zip(keys, handles)])
+for job in manifest.jobs(status='submitted', theta=0.4):
+    result = backend.get_result(job['handle'])
+"""
+import json
+import sqlite3
+import time
+from pytket.backends import ResultHandle
+
+KEY = ('theta', 'n_steps', 'basis', 'Lx', 'Ly', 'dt')
+STATUSES = ('submitted', 'done', 'failed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    theta REAL, n_steps INTEGER, basis TEXT, Lx INTEGER, Ly INTEGER, dt REAL,
+    handle TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT,
+    PRIMARY KEY (theta, n_steps, basis, Lx, Ly, dt)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, theta);
+"""
+
+
+def _key(key):
+    # The key as a tuple in the order of KEY, from a dict with (at least) the KEY fields.
+    return (float(key['theta']), int(key['n_steps']), str(key['basis']), int(key['Lx']), int(key['Ly']),
+            float(key['dt']))
+
+
+class JobManifest:
+    def __init__(self, filename='jobs.sqlite'):
+        self.connection = sqlite3.connect(filename)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_jobs(self, jobs, status='submitted'):
+        # Records the (key, handle) pairs in one transaction, replacing jobs with equal keys.
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)',
+                [_key(key) + (str(handle), status, now, now) for key, handle in jobs])
+
+    def set_status(self, key, status, result=None):
+        # Updates the status of a job, and its result (any JSON serialisable value) if given.
+        if status not in STATUSES:
+            raise ValueError('Unknown status {}'.format(status))
+        with self.connection:
+            cursor = self.connection.execute(
+                'UPDATE jobs SET status = ?, updated = ?, result = COALESCE(?, result) WHERE {}'.format(
+                    ' AND '.join('{} = ?'.format(name) for name in KEY)),
+                (status, time.time(), None if result is None else json.dumps(result)) + _key(key))
+        if cursor.rowcount == 0:
+            raise KeyError(_key(key))
+
+    def jobs(self, status=None, **where):
+        # All jobs with the given status (or one of a list of statuses) and key fields,
+        # e.g. jobs(status='done', theta=0.4) or jobs(status=['submitted', 'done']),
+        # as dicts with the ResultHandle and the decoded result, ordered by key.
+        unknown = set(where) - set(KEY)
+        if unknown:
+            raise ValueError('Unknown key fields {}'.format(sorted(unknown)))
+        conditions = ['{} = ?'.format(name) for name in where]
+        values = list(where.values())
+        if status is not None:
+            statuses = [status] if isinstance(status, str) else list(status)
+            conditions.append('status IN ({})'.format(', '.join('?' * len(statuses))))
+            values += statuses
+        query = 'SELECT * FROM jobs'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY ' + ', '.join(KEY)
+        jobs = []
+        for row in self.connection.execute(query, values):
+            job = dict(row)
+            job['handle'] = ResultHandle.from_str(job['handle'])
+            job['result'] = None if job['result'] is None else json.loads(job['result'])
+            jobs.append(job)
+        return jobs
+
+    def pending(self):
+        # All jobs that have been submitted but not retrieved yet.
+        return self.jobs(status='submitted')
+
+    def status(self, key):
+        # The status of the job with the given key, or None if it is not in the manifest.
+        query = 'SELECT status FROM jobs WHERE ' + ' AND '.join('{} = ?'.format(name) for name in KEY)
+        row = self.connection.execute(query, _key(key)).fetchone()
+        return None if row is None else row['status']
+
+    def __contains__(self, key):
+        return self.status(key) is not None
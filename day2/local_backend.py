@@ -0,0 +1,159 @@
+"""
+A local stand-in for the NexusBackend used in scripts 05 and 06,
+to test the submission and retrieval pipeline offline.
+
+Circuits are simulated with the numpy statevector simulator when
+they are processed, and n_shots outcomes are drawn at once from a
+multinomial distribution over the basis states, so millions of shots
+cost the same as a hundred. The counts are saved bit-packed (see
+counts_store.py) to results_dir, so that handles can be pickled and
+the results retrieved by another LocalBackend in a different script,
+as with Nexus. get_readouts returns the counts as arrays, for
+analysis code that does not need a BackendResult.
+
+Handles are deterministic: they are made of a hash of the circuit,
+the number of shots and the seed of the sampling, where the seed of
+the k-th submitted circuit is seed + k.
+
+With queue_time > 0, circuit_status reports a circuit as queued for
+that many seconds after its submission, to mimic the device queue
+when testing code that polls, e.g. async_pipeline.py.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from pytket.backends import Backend, CircuitNotRunError, CircuitStatus, ResultHandle, StatusEnum
+from pytket.backends.backendinfo import BackendInfo
+from pytket.backends.backendresult import BackendResult
+from pytket.circuit import Bit, OpType
+from pytket.passes import AutoRebase, DecomposeBoxes, RemoveRedundancies, SequencePass
+from pytket.predicates import GateSetPredicate, NoClassicalControlPredicate, NoMidMeasurePredicate, \
+    NoSymbolsPredicate
+from pytket.utils.outcomearray import OutcomeArray
+
+from numpy_statevector import simulate
+from counts_store import pack_readouts, unpack_readouts
+
+_GATE_SET = {OpType.H, OpType.X, OpType.Y, OpType.Z, OpType.S, OpType.Sdg, OpType.Rx, OpType.Ry, OpType.Rz,
+             OpType.XXPhase, OpType.YYPhase, OpType.ZZPhase}
+
+
+def circuit_digest(qc):
+    # Hash of the circuit, independent of the python session.
+    return hashlib.sha256(json.dumps(qc.to_dict(), sort_keys=True).encode()).hexdigest()[:32]
+
+
+def sample_counts(probabilities, n_shots, rng):
+    # Returns the basis states that occurred and how often, from one multinomial draw.
+    probabilities = np.abs(probabilities) / np.sum(np.abs(probabilities))
+    frequencies = rng.multinomial(n_shots, probabilities)
+    indices = np.flatnonzero(frequencies)
+    return indices, frequencies[indices]
+
+
+class LocalBackend(Backend):
+    _supports_counts = True
+    _supports_shots = True
+    _persistent_handles = True
+
+    def __init__(self, results_dir='local_results', seed=0, precision='double', queue_time=0.0):
+        super().__init__()
+        self.results_dir = results_dir
+        self.seed = seed
+        self.dtype = np.complex64 if precision == 'single' else np.complex128
+        self.queue_time = queue_time
+        self._n_submitted = 0
+        self._submitted = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _result_id_type(self):
+        return (str, int, int)
+
+    @property
+    def backend_info(self):
+        return BackendInfo(type(self).__name__, 'local', '0.1', None, _GATE_SET | {OpType.Measure})
+
+    @property
+    def required_predicates(self):
+        return [
+            NoClassicalControlPredicate(),
+            NoMidMeasurePredicate(),
+            NoSymbolsPredicate(),
+            GateSetPredicate(_GATE_SET | {OpType.Measure, OpType.Barrier}),
+        ]
+
+    def rebase_pass(self):
+        return AutoRebase(_GATE_SET)
+
+    def default_compilation_pass(self, optimisation_level=2):
+        passes = [DecomposeBoxes(), self.rebase_pass()]
+        if optimisation_level > 0:
+            passes.append(RemoveRedundancies())
+        return SequencePass(passes)
+
+    def _filename(self, handle):
+        return os.path.join(self.results_dir, '{}_{}_{}.npz'.format(*handle))
+
+    def _run(self, qc, n_shots, seed):
+        # Bits of the sampled basis states, in the order of qc.bits, and their counts.
+        state = simulate(qc, dtype=self.dtype)
+        indices, frequencies = sample_counts(np.abs(state) ** 2, n_shots, np.random.default_rng(seed))
+        qubit_to_bit = qc.qubit_to_bit_map
+        readouts = np.zeros((len(indices), len(qc.bits)), dtype=np.uint8)
+        for qubit, bit in qubit_to_bit.items():
+            readouts[:, qc.bits.index(bit)] = (indices >> qubit.index[0]) & 1
+        return readouts, frequencies
+
+    def process_circuits(self, circuits, n_shots=None, valid_check=True, **kwargs):
+        n_shots_list = Backend._get_n_shots_as_list(n_shots, len(circuits), optional=False)
+        if valid_check:
+            self._check_all_circuits(circuits)
+        os.makedirs(self.results_dir, exist_ok=True)
+        handles = []
+        for qc, n in zip(circuits, n_shots_list):
+            with self._lock:
+                handle = ResultHandle(circuit_digest(qc), n, self.seed + self._n_submitted)
+                self._n_submitted += 1
+            readouts, frequencies = self._run(qc, n, handle[2])
+            np.savez(self._filename(handle), packed=pack_readouts(readouts), n_bits=readouts.shape[1],
+                     counts=frequencies, bits=json.dumps([b.to_list() for b in qc.bits]))
+            self._submitted[handle] = time.time()
+            handles.append(handle)
+        return handles
+
+    def circuit_status(self, handle):
+        self._check_handle_type(handle)
+        if time.time() < self._submitted.get(handle, 0) + self.queue_time:
+            return CircuitStatus(StatusEnum.QUEUED)
+        if handle in self._cache or os.path.exists(self._filename(handle)):
+            return CircuitStatus(StatusEnum.COMPLETED)
+        raise CircuitNotRunError(handle)
+
+    def get_readouts(self, handle):
+        # The distinct readouts as a (n_outcomes, n_bits) uint8 array and their counts,
+        # without building a BackendResult, whose get_counts is slow for many outcomes.
+        self._check_handle_type(handle)
+        if not os.path.exists(self._filename(handle)):
+            raise CircuitNotRunError(handle)
+        with np.load(self._filename(handle)) as data:
+            return unpack_readouts(data['packed'], int(data['n_bits'])), data['counts']
+
+    def get_result(self, handle, **kwargs):
+        self._check_handle_type(handle)
+        if handle not in self._cache:
+            readouts, frequencies = self.get_readouts(handle)
+            with np.load(self._filename(handle)) as data:
+                c_bits = [Bit.from_list(b) for b in json.loads(str(data['bits']))]
+            counts = Counter({
+                OutcomeArray.from_readouts(readout[None, :]): int(frequency)
+                for readout, frequency in zip(readouts, frequencies)
+            })
+            self._cache[handle] = {'result': BackendResult(counts=counts, c_bits=c_bits)}
+        return self._cache[handle]['result']
+
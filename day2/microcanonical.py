@@ -0,0 +1,109 @@
+"""
+Helpers to evaluate microcanonical expectation values from
+exact diagonalisation, see script #01.
+
+Instead of building the density matrix
+rho(E0) = V diag(exp(-(E-E0)^2/variance)) V^dagger / Z
+for every energy centre E0, the observable is rotated into the
+eigenbasis once and only its diagonal O_kk = <k|O|k> is kept, since
+Tr[O rho(E0)] = sum_k w_k(E0) O_kk.
+All energy centres are then evaluated as one product of the
+(n_centres, D) matrix of weights w_k(E0) with the vector O_kk.
+
+For larger systems, chebyshev_microcanonical avoids the
+diagonalisation altogether: Tr[O f(H-E0)] and Tr[f(H-E0)] with the
+Gaussian filter f are expanded in Chebyshev polynomials of H, whose
+moments Tr[O T_n(H)] are estimated stochastically with random vectors,
+using only sparse matrix-vector products. One set of moments gives
+the order parameter at all energy centres.
+"""
+import numpy as np
+
+
+def eigenbasis_diagonal(operator, V):
+    # O_kk = <k|O|k> for the eigenvectors k in the columns of V.
+    # operator can be a quspin operator, scipy sparse matrix or numpy array.
+    return np.real(np.einsum('ik,ik->k', V.conj(), operator.dot(V)))
+
+
+def microcanonical_weights(E, energy_centers, variance):
+    # Normalised Gaussian filter weights, one row per energy centre.
+    # Each row is shifted by its largest exponent before exponentiating,
+    # so energy centres far from the spectrum do not underflow to 0/0.
+    exponents = -(np.asarray(E)[np.newaxis, :] - np.asarray(energy_centers)[:, np.newaxis]) ** 2 / variance
+    weights = np.exp(exponents - exponents.max(axis=1, keepdims=True))
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def microcanonical_sweep(E, O_diag, energy_centers, variance):
+    # Microcanonical expectation values Tr[O rho(E0)] for all energy centres E0.
+    return microcanonical_weights(E, energy_centers, variance) @ O_diag
+
+
+def _spectral_bounds(H):
+    # Lowest and highest eigenvalue of the sparse (quspin) operator H.
+    E_min = H.eigsh(k=1, which='SA', return_eigenvectors=False)[0]
+    E_max = H.eigsh(k=1, which='LA', return_eigenvectors=False)[0]
+    return E_min, E_max
+
+
+def chebyshev_moments(H, O, n_moments, n_vectors=10, bounds=None, seed=None):
+    # Stochastic estimates of Tr[O T_n(H~)] and Tr[T_n(H~)] for n < n_moments, with
+    # H~ = (H - b)/a the Hamiltonian rescaled to [-1, 1].
+    # Returns the moments for each random vector, with shape (n_vectors, n_moments),
+    # and the rescaling (a, b).
+    # H and O can be quspin operators or scipy sparse matrices; O must be hermitian.
+    E_min, E_max = _spectral_bounds(H) if bounds is None else bounds
+    a = (E_max - E_min) / 2 * 1.01  # Small margin to keep the spectrum inside [-1, 1].
+    b = (E_max + E_min) / 2
+
+    rng = np.random.default_rng(seed)
+    D = H.shape[0]
+    if np.iscomplexobj(np.ones(1, dtype=H.dtype)) or np.iscomplexobj(np.ones(1, dtype=O.dtype)):
+        r = np.exp(2j * np.pi * rng.random((D, n_vectors)))  # Random phase vectors
+    else:
+        r = rng.choice([-1.0, 1.0], size=(D, n_vectors))  # Rademacher vectors
+    Or = O.dot(r)
+
+    O_moments = np.zeros((n_vectors, n_moments))
+    moments = np.zeros((n_vectors, n_moments))
+    v_prev, v = r, (H.dot(r) - b * r) / a
+    O_moments[:, 0] = np.real(np.sum(Or.conj() * v_prev, axis=0))
+    moments[:, 0] = np.real(np.sum(r.conj() * v_prev, axis=0))
+    for n in range(1, n_moments):
+        O_moments[:, n] = np.real(np.sum(Or.conj() * v, axis=0))
+        moments[:, n] = np.real(np.sum(r.conj() * v, axis=0))
+        v_prev, v = v, 2 * (H.dot(v) - b * v) / a - v_prev
+    return O_moments, moments, (a, b)
+
+
+def chebyshev_coefficients(energy_centers, variance, n_moments, scale, n_points=None):
+    # Chebyshev coefficients of the Gaussian filters exp(-(E-E0)^2/variance), E = a x + b,
+    # for all energy centres E0 at once, with shape (n_centres, n_moments).
+    a, b = scale
+    n_points = 2 * n_moments if n_points is None else n_points
+    theta = np.pi * (np.arange(n_points) + 0.5) / n_points  # Chebyshev-Gauss nodes x = cos(theta)
+    E = a * np.cos(theta) + b
+    f = np.exp(-(E[np.newaxis, :] - np.asarray(energy_centers)[:, np.newaxis]) ** 2 / variance)
+    coefficients = 2 / n_points * f @ np.cos(np.outer(theta, np.arange(n_moments)))
+    coefficients[:, 0] /= 2
+    return coefficients
+
+
+def chebyshev_microcanonical(H, O, energy_centers, variance, n_moments=200, n_vectors=10, bounds=None, seed=None):
+    # Microcanonical expectation values Tr[O f(H-E0)]/Tr[f(H-E0)] for all energy centres E0,
+    # from one set of stochastic Chebyshev moments of H (see chebyshev_moments).
+    # n_moments must resolve the Gaussian filter, i.e. be well above the spectral width
+    # divided by sqrt(variance).
+    # Returns the values and their standard errors from a jackknife over the random vectors.
+    O_moments, moments, scale = chebyshev_moments(H, O, n_moments, n_vectors, bounds, seed)
+    coefficients = chebyshev_coefficients(energy_centers, variance, n_moments, scale)
+    numerators = O_moments @ coefficients.T  # (n_vectors, n_centres)
+    denominators = moments @ coefficients.T
+
+    values = numerators.sum(axis=0) / denominators.sum(axis=0)
+    if n_vectors < 2:
+        return values, np.full_like(values, np.nan)
+    jackknife = (numerators.sum(axis=0) - numerators) / (denominators.sum(axis=0) - denominators)
+    errors = np.sqrt((n_vectors - 1) * np.mean((jackknife - jackknife.mean(axis=0)) ** 2, axis=0))
+    return values, errors
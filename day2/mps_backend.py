@@ -0,0 +1,135 @@
+"""
+An MPS (matrix product state) backend for the XY model Trotter
+circuits, to check circuits classically beyond the reach of
+statevector simulation, at short times.
+
+Qubit q is site q of the MPS, i.e. the tenpy lattice order used by
+get_qubit_couplings. The gates of the circuits from XY_step are
+applied one by one with tenpy: two-qubit gates on non-neighbouring
+sites are applied after swapping the sites next to each other, and
+every two-site update is truncated to at most chi_max singular values.
+The discarded weight is accumulated and reported as truncation error.
+
+Requires tenpy (pip install physics-tenpy).
+"""
+import numpy as np
+import tenpy.linalg.np_conserved as npc
+from tenpy.algorithms.truncation import svd_theta, TruncationError
+from tenpy.networks.mps import MPS
+from tenpy.networks.site import SpinHalfSite
+from numpy_statevector import compile_circuit
+
+_PAULIS = {
+    'XXPhase': np.array([[0, 1], [1, 0]]),
+    'YYPhase': np.array([[0, -1j], [1j, 0]]),
+    'ZZPhase': np.diag([1, -1]),
+}
+
+
+def product_state_mps(qc):
+    # MPS of the product state prepared by the single-qubit gates in qc.
+    # The SpinHalfSite basis (up, down) is the qubit basis (|0>, |1>).
+    states = [np.array([1, 0], dtype=complex) for _ in range(qc.n_qubits)]
+    for name, qubits, matrix in compile_circuit(qc):
+        if name != '1q':
+            raise ValueError('The state preparation may only contain single-qubit gates')
+        states[qubits[0]] = matrix @ states[qubits[0]]
+    site = SpinHalfSite(conserve='None')
+    return MPS.from_product_state([site] * qc.n_qubits, states, dtype=complex,
+                                  unit_cell_width=qc.n_qubits)
+
+
+def _two_site_gate(psi, i, name, angle):
+    # exp(-i angle P P) as operator on the sites i, i+1.
+    P = _PAULIS[name]
+    U = np.cos(angle) * np.eye(4) - 1j * np.sin(angle) * np.kron(P, P)
+    leg = psi.sites[i].leg
+    return npc.Array.from_ndarray(U.reshape(2, 2, 2, 2), [leg, leg, leg.conj(), leg.conj()],
+                                  labels=['p0', 'p1', 'p0*', 'p1*'])
+
+
+def _update_bond(psi, i, U, trunc_par):
+    # Applies U to the sites i, i+1 and truncates, as in tenpy's TEBDEngine.update_bond.
+    C = psi.get_theta(i, n=2, formL=0.)
+    C = npc.tensordot(U, C, axes=(['p0*', 'p1*'], ['p0', 'p1']))
+    C.itranspose(['vL', 'p0', 'p1', 'vR'])
+    theta = C.scale_axis(psi.get_SL(i), 'vL')
+    theta = theta.combine_legs([('vL', 'p0'), ('p1', 'vR')], qconj=[+1, -1])
+    _, S, V, trunc_err, renormalize = svd_theta(theta, trunc_par, [psi.get_B(i, None).qtotal, None],
+                                                inner_labels=['vR', 'vL'])
+    B_R = V.split_legs(1).ireplace_label('p1', 'p')
+    B_L = npc.tensordot(C.combine_legs(('p1', 'vR'), pipes=theta.legs[1]), V.conj(),
+                        axes=['(p1.vR)', '(p1*.vR*)'])
+    B_L.ireplace_labels(['vL*', 'p0'], ['vR', 'p'])
+    B_L /= renormalize
+    psi.set_SR(i, S)
+    psi.set_B(i, B_L, form='B')
+    psi.set_B(i + 1, B_R, form='B')
+    return trunc_err
+
+
+def apply_circuit_mps(psi, gates, trunc_par):
+    # Applies the gates from compile_circuit to psi in place and returns the TruncationError.
+    trunc_err = TruncationError()
+    for name, qubits, param in gates:
+        if name == '1q':
+            leg = psi.sites[qubits[0]].leg
+            op = npc.Array.from_ndarray(param, [leg, leg.conj()], labels=['p', 'p*'])
+            psi.apply_local_op(qubits[0], op, unitary=True)
+            continue
+        i, j = sorted(qubits)
+        # Move site j next to site i, apply the gate and move it back.
+        for k in range(j - 1, i, -1):
+            trunc_err += psi.swap_sites(k, trunc_par=trunc_par)
+        trunc_err += _update_bond(psi, i, _two_site_gate(psi, i, name, param), trunc_par)
+        for k in range(i + 1, j):
+            trunc_err += psi.swap_sites(k, trunc_par=trunc_par)
+    return trunc_err
+
+
+def mps_observables(psi, couplings, J=-1.0):
+    # <Sx^2 + Sy^2> and the energy <J sum_<ij> (X_i X_j + Y_i Y_j)> of psi.
+    N = psi.L
+    XX = np.real(psi.correlation_function('Sigmax', 'Sigmax'))
+    YY = np.real(psi.correlation_function('Sigmay', 'Sigmay'))
+    couplings = np.asarray(couplings)
+    energy = J * np.sum(XX[couplings[:, 0], couplings[:, 1]] + YY[couplings[:, 0], couplings[:, 1]])
+    return (np.sum(XX) + np.sum(YY)) / N ** 2, energy
+
+
+def evolve_mps(preparation, step, n_steps, couplings, chi_max=64, svd_min=1e-10):
+    # Yields a dict with the order parameter, energy, accumulated truncation error
+    # (discarded weight) and maximal bond dimension initially and after each of the
+    # n_steps applications of the circuit step, e.g. XY_step(dt, couplings).
+    trunc_par = {'chi_max': chi_max, 'svd_min': svd_min}
+    psi = product_state_mps(preparation)
+    gates = compile_circuit(step)
+    trunc_err = TruncationError()
+    for t in range(n_steps + 1):
+        if t > 0:
+            trunc_err += apply_circuit_mps(psi, gates, trunc_par)
+        order_parameter, energy = mps_observables(psi, couplings)
+        yield {
+            'order_parameter': order_parameter,
+            'energy': energy,
+            'truncation_error': trunc_err.eps,
+            'chi': max(psi.chi),
+        }
+
+
+if __name__ == '__main__':
+    from pytket import Circuit
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings
+    from xy_circuits import XY_step
+
+    Lx, Ly = 6, 6
+    N = Lx * Ly
+    theta = 0.4
+    couplings = get_qubit_couplings(Square(Lx, Ly, None, bc='periodic'))
+    preparation = Circuit(N)
+    for j in range(N):
+        preparation.H(j)
+        preparation.Ry(theta * 2 / np.pi, j)
+    for t, result in enumerate(evolve_mps(preparation, XY_step(0.2, couplings), 5, couplings)):
+        print('t={}: {}'.format(t, result))
@@ -0,0 +1,118 @@
+"""
+Lightweight versions of the tenpy lattices used in these scripts.
+
+They produce the same qubit order and the same couplings (through
+get_qubit_couplings in tenpy_lattice_adapter) as the tenpy lattices
+of the same name with the default order, but only need numpy,
+so that scripts which only need a couplings list start in milliseconds.
+tenpy is only imported when a lattice is converted with to_tenpy,
+e.g. for draw_lattice, or checked with validate_against_tenpy.
+
+Usage is the same as for tenpy, i.e.
+lattice = Square(Lx, Ly, None, bc='periodic')
+"""
+import numpy as np
+
+
+class NativeLattice:
+    # Mirrors the attributes of tenpy.models.lattice.Lattice that
+    # tenpy_lattice_adapter needs: Ls, bc (True for open directions),
+    # order (the [X,Y,U] coordinate of each qubit) and pairs.
+    tenpy_name = None
+
+    def __init__(self, Ls, unit_cell_size, pairs, bc='open', priority=None):
+        self.Ls = np.array(Ls, dtype=np.intp)
+        self.dim = len(self.Ls)
+        if isinstance(bc, str):
+            bc = [bc] * self.dim
+        if len(bc) != self.dim or any(b not in ('open', 'periodic') for b in bc):
+            raise ValueError('bc must be open or periodic in each of the {} directions, got {}'.format(self.dim, bc))
+        self._bc_args = list(bc)
+        self.bc = np.array([b == 'open' for b in bc])
+        self.pairs = pairs
+        self.order = self._default_order(tuple(self.Ls) + (unit_cell_size,), priority)
+
+    @staticmethod
+    def _default_order(shape, priority):
+        # C-style order, i.e. the direction with the highest priority
+        # increases fastest (same as tenpy.models.lattice.get_order).
+        if priority is None:
+            priority = range(len(shape))
+        perm = np.argsort(priority)
+        order = np.indices(np.array(shape)[perm]).reshape(len(shape), -1).T
+        return order[:, np.argsort(perm)]
+
+    @property
+    def N_sites(self):
+        return len(self.order)
+
+    def _tenpy_args(self):
+        return tuple(self.Ls)
+
+    def to_tenpy(self):
+        # Builds the equivalent tenpy lattice, e.g. for plotting.
+        from tenpy.models import lattice
+        cls = getattr(lattice, self.tenpy_name)
+        return cls(*self._tenpy_args(), None, bc=self._bc_args)
+
+
+class Chain(NativeLattice):
+    tenpy_name = 'Chain'
+
+    def __init__(self, L, site=None, bc='open'):
+        pairs = {
+            'nearest_neighbors': [(0, 0, np.array([1]))],
+            'next_nearest_neighbors': [(0, 0, np.array([2]))],
+            'next_next_nearest_neighbors': [(0, 0, np.array([3]))],
+        }
+        NativeLattice.__init__(self, [L], 1, pairs, bc=bc)
+
+
+class Square(NativeLattice):
+    tenpy_name = 'Square'
+
+    def __init__(self, Lx, Ly, site=None, bc='open'):
+        pairs = {
+            'nearest_neighbors': [(0, 0, np.array([1, 0])), (0, 0, np.array([0, 1]))],
+            'next_nearest_neighbors': [(0, 0, np.array([1, 1])), (0, 0, np.array([1, -1]))],
+            'next_next_nearest_neighbors': [(0, 0, np.array([2, 0])), (0, 0, np.array([0, 2]))],
+        }
+        NativeLattice.__init__(self, [Lx, Ly], 1, pairs, bc=bc)
+
+
+class Triangular(NativeLattice):
+    tenpy_name = 'Triangular'
+
+    def __init__(self, Lx, Ly, site=None, bc='open'):
+        pairs = {
+            'nearest_neighbors': [(0, 0, np.array([1, 0])), (0, 0, np.array([-1, 1])), (0, 0, np.array([0, -1]))],
+            'next_nearest_neighbors': [(0, 0, np.array([2, -1])), (0, 0, np.array([1, 1])), (0, 0, np.array([-1, 2]))],
+            'next_next_nearest_neighbors': [(0, 0, np.array([2, 0])), (0, 0, np.array([0, 2])), (0, 0, np.array([-2, 2]))],
+        }
+        NativeLattice.__init__(self, [Lx, Ly], 1, pairs, bc=bc)
+
+
+class Honeycomb(NativeLattice):
+    tenpy_name = 'Honeycomb'
+
+    def __init__(self, Lx, Ly, site=None, bc='open'):
+        pairs = {
+            'nearest_neighbors': [(0, 1, np.array([0, 0])), (1, 0, np.array([1, 0])), (1, 0, np.array([0, 1]))],
+            'next_nearest_neighbors': [(0, 0, np.array([1, 0])), (0, 0, np.array([0, 1])), (0, 0, np.array([1, -1])),
+                                       (1, 1, np.array([1, 0])), (1, 1, np.array([0, 1])), (1, 1, np.array([1, -1]))],
+            'next_next_nearest_neighbors': [(1, 0, np.array([1, 1])), (0, 1, np.array([-1, 1])), (0, 1, np.array([1, -1]))],
+        }
+        # tenpy orders the Honeycomb lattice first along x, then by sublattice, then along y.
+        NativeLattice.__init__(self, [Lx, Ly], 2, pairs, bc=bc, priority=(0, 2, 1))
+
+
+def validate_against_tenpy(lattice):
+    # Checks that the qubit order and all couplings agree with the
+    # equivalent tenpy lattice. Raises a ValueError otherwise.
+    from tenpy_lattice_adapter import get_qubit_couplings
+    reference = lattice.to_tenpy()
+    if not np.array_equal(lattice.order, reference.order):
+        raise ValueError('Qubit order of {} differs from tenpy'.format(lattice.tenpy_name))
+    for which in lattice.pairs:
+        if not np.array_equal(get_qubit_couplings(lattice, which), get_qubit_couplings(reference, which)):
+            raise ValueError('{} couplings of {} differ from tenpy'.format(which, lattice.tenpy_name))
@@ -0,0 +1,155 @@
+"""
+Noisy simulation of the XY model Trotter circuits by quantum
+trajectories, to predict what the H-series emulator will measure
+before spending emulator quota.
+
+The noise model is H-series like: after every single-qubit gate a
+random Pauli error occurs with probability p1, after every two-qubit
+gate a random non-identity two-qubit Pauli with probability p2, and
+each measured bit is flipped with probability p_meas. The errors are
+drawn independently for each trajectory, so the total error grows
+with the gate count of the circuit. Depolarising noise is a Pauli
+channel, so each trajectory stays a normalised pure state.
+
+Trajectories run in chunks in a process pool. The averages of the
+order parameter and the energy after each Trotter step are updated
+with each chunk, in the order in which the chunks were submitted, and
+the sampling stops early once the standard error of the order
+parameter is below target_error, e.g.
+
+for estimate in noisy_trajectories(qc, XY_step(dt, couplings), n_steps, couplings, target_error=1e-3):
+    print(estimate['n_trajectories'], estimate['order_parameter_error'].max())
+"""
+from collections import deque
+import os
+import numpy as np
+from numpy_statevector import compile_circuit, apply_gates, _apply_single_qubit, order_parameter, xy_energy
+from sweep_executor import spawn_pool
+
+# Error probabilities per gate and per measured bit, roughly those of H1-1.
+H_SERIES_NOISE = {'p1': 3e-5, 'p2': 2e-3, 'p_meas': 3e-3}
+
+_PAULI_MATRICES = [None, np.array([[0, 1], [1, 0]]), np.array([[0, -1j], [1j, 0]]), np.diag([1, -1])]
+
+
+def _apply_noisy(state, gates, n_qubits, noise, rng):
+    # Applies gates to state, with a random Pauli error after each gate that fails.
+    # The failing gates are drawn at once, the gates in between are applied as a block.
+    p = np.array([noise['p1'] if len(qubits) == 1 else noise['p2'] for _, qubits, _ in gates])
+    start = 0
+    for g in np.flatnonzero(rng.random(len(gates)) < p):
+        apply_gates(state, gates[start:g + 1], n_qubits)
+        qubits = gates[g][1]
+        # A uniformly random non-identity Pauli string on the qubits of the gate.
+        error = rng.integers(1, 4 ** len(qubits))
+        for q in qubits:
+            if error % 4:
+                _apply_single_qubit(state, n_qubits, q, _PAULI_MATRICES[error % 4])
+            error //= 4
+        start = g + 1
+    apply_gates(state, gates[start:], n_qubits)
+
+
+def _run_trajectories(preparation, step, n_qubits, n_steps, couplings, noise, n_trajectories, seed):
+    # Sums and sums of squares over n_trajectories trajectories of the order parameter
+    # and the energy initially and after each step, as (n_steps + 1, 2) arrays.
+    rng = np.random.default_rng(seed)
+    total = np.zeros((n_steps + 1, 2))
+    total_squares = np.zeros((n_steps + 1, 2))
+    for _ in range(n_trajectories):
+        state = np.zeros(2 ** n_qubits, dtype=np.complex128)
+        state[0] = 1
+        _apply_noisy(state, preparation, n_qubits, noise, rng)
+        values = np.empty((n_steps + 1, 2))
+        values[0] = order_parameter(state), xy_energy(state, couplings)
+        for t in range(1, n_steps + 1):
+            _apply_noisy(state, step, n_qubits, noise, rng)
+            values[t] = order_parameter(state), xy_energy(state, couplings)
+        total += values
+        total_squares += values ** 2
+    return total, total_squares
+
+
+def _estimate(total, total_squares, n, N, p_meas):
+    # Means and standard errors, including the readout errors. Independent bit flips
+    # multiply each <X_i X_j> with i != j by (1 - 2 p_meas)^2, while <X_i X_i> = 1.
+    mean = total / n
+    variance = np.maximum(total_squares / n - mean ** 2, 0) * n / max(n - 1, 1)
+    error = np.sqrt(variance / n)
+    f = (1 - 2 * p_meas) ** 2
+    return {
+        'n_trajectories': n,
+        'order_parameter': f * mean[:, 0] + (1 - f) * 2 / N,
+        'order_parameter_error': f * error[:, 0],
+        'energy': f * mean[:, 1],
+        'energy_error': f * error[:, 1],
+    }
+
+
+def noisy_trajectories(preparation, step, n_steps, couplings, noise=H_SERIES_NOISE, target_error=1e-3,
+                       max_trajectories=10000, min_trajectories=100, chunk_size=50, max_workers=None,
+                       seed=None):
+    # Yields the estimate of the noisy order parameter and XY energy (with J=-1) initially
+    # and after each of the n_steps applications of step, a dict with the means and
+    # standard errors as arrays of length n_steps + 1, after every finished chunk of
+    # chunk_size trajectories. Stops once at least min_trajectories have run and the
+    # largest standard error of the order parameter is at most target_error, or after
+    # max_trajectories trajectories. The chunks are added up in the order in which they
+    # were submitted, so the estimates only depend on seed, not on the timing of the workers.
+    N = preparation.n_qubits
+    preparation = compile_circuit(preparation)
+    step = compile_circuit(step)
+    couplings = np.asarray(couplings)
+    seeds = np.random.SeedSequence(seed)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    total = np.zeros((n_steps + 1, 2))
+    total_squares = np.zeros((n_steps + 1, 2))
+    n = 0
+    submitted = 0
+    with spawn_pool(max_workers) as pool:
+        running = deque()
+        while True:
+            # Keep two chunks per worker queued, so that no worker idles.
+            while len(running) < 2 * max_workers and submitted < max_trajectories:
+                size = min(chunk_size, max_trajectories - submitted)
+                future = pool.submit(_run_trajectories, preparation, step, N, n_steps, couplings, noise, size,
+                                     seeds.spawn(1)[0])
+                running.append((future, size))
+                submitted += size
+            if not running:
+                return
+            future, size = running.popleft()
+            chunk_total, chunk_squares = future.result()
+            total += chunk_total
+            total_squares += chunk_squares
+            n += size
+            estimate = _estimate(total, total_squares, n, N, noise['p_meas'])
+            yield estimate
+            if n >= min_trajectories and np.max(estimate['order_parameter_error']) <= target_error:
+                for future, _ in running:
+                    future.cancel()
+                return
+
+
+if __name__ == '__main__':
+    from pytket import Circuit
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings
+    from xy_circuits import XY_step
+
+    Lx, Ly = 3, 3
+    N = Lx * Ly
+    theta = 0.4
+    n_steps = 10
+    couplings = get_qubit_couplings(Square(Lx, Ly, None, bc='periodic'))
+    qc = Circuit(N)
+    for j in range(N):
+        qc.H(j)
+        qc.Ry(theta * 2 / np.pi, j)
+    for estimate in noisy_trajectories(qc, XY_step(0.2, couplings), n_steps, couplings,
+                                       target_error=5e-3):
+        print('{} trajectories, max error {:.2e}'.format(estimate['n_trajectories'],
+                                                          np.max(estimate['order_parameter_error'])))
+    print(estimate['order_parameter'])
@@ -0,0 +1,173 @@
+"""
+A small in-process statevector simulator for the gates used in
+the XY model circuits (H, Rx, Ry, Rz, S, Sdg, X, Y, Z, XXPhase,
+YYPhase, ZZPhase), without converting to qiskit or building an Aer
+backend.
+
+Gates are applied in place on a complex64 or complex128 numpy
+array, as strided updates on views of the state. The amplitudes
+use the qiskit ordering, i.e. qubit q is bit q of the index, so
+results can be compared directly with get_statevector.
+Angles follow the pytket convention of half-turns.
+
+All functions also accept a batch of states as the columns of a
+(2^N, n_batch) array, to which every gate is applied at once.
+"""
+import numpy as np
+
+_SQRT_HALF = np.sqrt(0.5)
+
+
+def _single_qubit_matrix(name, params):
+    if name == 'H':
+        return np.array([[_SQRT_HALF, _SQRT_HALF], [_SQRT_HALF, -_SQRT_HALF]])
+    if name == 'X':
+        return np.array([[0, 1], [1, 0]])
+    if name == 'Y':
+        return np.array([[0, -1j], [1j, 0]])
+    if name == 'Z':
+        return np.diag([1, -1])
+    if name == 'S':
+        return np.diag([1, 1j])
+    if name == 'Sdg':
+        return np.diag([1, -1j])
+    angle = np.pi / 2 * params[0]
+    c, s = np.cos(angle), np.sin(angle)
+    if name == 'Rx':
+        return np.array([[c, -1j * s], [-1j * s, c]])
+    if name == 'Ry':
+        return np.array([[c, -s], [s, c]])
+    if name == 'Rz':
+        return np.diag([np.exp(-1j * angle), np.exp(1j * angle)])
+    raise ValueError('Unsupported gate {}'.format(name))
+
+
+def compile_circuit(qc):
+    # Turns a pytket circuit into a list of (gate, qubits, parameters) that
+    # apply_gates can apply without looking at the circuit again.
+    # Measurements are skipped, see the qubit_to_bit_map of the circuit.
+    gates = []
+    for command in qc.get_commands():
+        name = command.op.type.name
+        qubits = tuple(q.index[0] for q in command.qubits)
+        params = [float(p) for p in command.op.params]
+        if name in ('Barrier', 'Measure'):
+            continue
+        if name in ('XXPhase', 'YYPhase', 'ZZPhase'):
+            gates.append((name, qubits, np.pi / 2 * params[0]))
+        elif len(qubits) == 1:
+            gates.append(('1q', qubits, _single_qubit_matrix(name, params)))
+        else:
+            raise ValueError('Unsupported gate {}'.format(name))
+    return gates
+
+
+def _views(state, n_qubits, *qubits):
+    # Views of state with one axis of length 2 for each qubit, highest qubit first,
+    # followed by the batch axis if state holds a batch of states.
+    shape = []
+    previous = n_qubits
+    for q in sorted(qubits, reverse=True):
+        shape += [2 ** (previous - q - 1), 2]
+        previous = q
+    return state.reshape(shape + [2 ** previous] + list(state.shape[1:]))
+
+
+def _inner(a, b, batched):
+    # <a|b>, for each state of the batch if batched.
+    axes = tuple(range(a.ndim - 1)) if batched else None
+    return np.sum(a.conj() * b, axis=axes)
+
+
+def _apply_single_qubit(state, n_qubits, q, matrix):
+    v = _views(state, n_qubits, q)
+    v0 = v[:, 0, :].copy()
+    v1 = v[:, 1, :]
+    v[:, 0, :] *= matrix[0, 0]
+    v[:, 0, :] += matrix[0, 1] * v1
+    v1 *= matrix[1, 1]
+    v1 += matrix[1, 0] * v0
+
+
+def _apply_two_qubit_phase(state, n_qubits, name, q1, q2, angle):
+    # exp(-i angle P P) for P = X, Y or Z on qubits q1, q2.
+    v = _views(state, n_qubits, q1, q2)
+    c, s = np.cos(angle), np.sin(angle)
+    if name == 'ZZPhase':
+        v[:, 0, :, 0, :] *= np.exp(-1j * angle)
+        v[:, 1, :, 1, :] *= np.exp(-1j * angle)
+        v[:, 0, :, 1, :] *= np.exp(1j * angle)
+        v[:, 1, :, 0, :] *= np.exp(1j * angle)
+        return
+    # XX maps |00> <-> |11> and |01> <-> |10> with sign +1,
+    # YY does the same with sign -1 and +1 respectively.
+    sign = -1 if name == 'YYPhase' else 1
+    for (a, b), coefficient in (((0, 1), -1j * s * sign), ((1, 0), -1j * s)):
+        pa = v[:, 0, :, a, :]
+        pb = v[:, 1, :, b, :]
+        pa_old = pa.copy()
+        pa *= c
+        pa += coefficient * pb
+        pb *= c
+        pb += coefficient * pa_old
+
+
+def apply_gates(state, gates, n_qubits):
+    # Applies the compiled gates to the flat state vector in place.
+    for name, qubits, param in gates:
+        if name == '1q':
+            _apply_single_qubit(state, n_qubits, qubits[0], param)
+        else:
+            _apply_two_qubit_phase(state, n_qubits, name, qubits[0], qubits[1], param)
+    return state
+
+
+def simulate(qc, initial_state=None, dtype=np.complex128):
+    # Statevector of the pytket circuit qc, starting from initial_state (|0...0> by default),
+    # which may also be a (2^N, n_batch) array of states.
+    # qc may also be a list of gates from compile_circuit, together with an initial_state.
+    if isinstance(qc, list):
+        gates = qc
+        n_qubits = int(np.log2(len(initial_state)))
+    else:
+        gates = compile_circuit(qc)
+        n_qubits = qc.n_qubits
+    if initial_state is None:
+        state = np.zeros(2 ** n_qubits, dtype=dtype)
+        state[0] = 1
+    else:
+        state = np.array(initial_state, dtype=dtype)
+    return apply_gates(state, gates, n_qubits)
+
+
+def order_parameter(state):
+    # <Sx^2 + Sy^2> with Sx = 1/N sum_i X_i, directly from the amplitudes
+    # (one value per state for a batch of states).
+    # (sum_i X_i)^2 + (sum_i Y_i)^2 = 2 (S+ S- + S- S+) with S+- = sum_i sigma+-_i,
+    # so the expectation value is 2 (|S+ psi|^2 + |S- psi|^2) / N^2, which only
+    # needs one bit flip per qubit instead of a sum over all pairs of qubits.
+    state = np.asarray(state)
+    n_qubits = int(np.log2(len(state)))
+    raising = np.zeros_like(state)
+    lowering = np.zeros_like(state)
+    for q in range(n_qubits):
+        v = _views(state, n_qubits, q)
+        _views(raising, n_qubits, q)[:, 0, :] += v[:, 1, :]
+        _views(lowering, n_qubits, q)[:, 1, :] += v[:, 0, :]
+    batched = state.ndim == 2
+    norm = _inner(raising, raising, batched).real + _inner(lowering, lowering, batched).real
+    return 2 * norm / n_qubits ** 2
+
+
+def xy_energy(state, couplings, J=-1.0):
+    # <J sum_<ij> (X_i X_j + Y_i Y_j)>, directly from the amplitudes
+    # (one value per state for a batch of states).
+    # X_i X_j + Y_i Y_j only connects |..0..1..> and |..1..0..> on qubits i, j,
+    # with amplitude 2, so each bond contributes 4 Re sum conj(psi_01) psi_10.
+    state = np.asarray(state)
+    n_qubits = int(np.log2(len(state)))
+    energy = 0
+    for q1, q2 in couplings:
+        v = _views(state, n_qubits, q1, q2)
+        energy += 4 * _inner(v[:, 0, :, 1, :], v[:, 1, :, 0, :], state.ndim == 2).real
+    return J * energy
@@ -0,0 +1,67 @@
+"""
+One consolidated table of the results of a sweep over theta and the
+number of Trotter steps, written by script #06 and read by script #07,
+instead of one pickle per theta.
+
+The table is a directory with one .npy file per column (theta, Lx,
+Ly, dt, n_steps, t, order_parameter, order_parameter_error, ...) and
+one row per circuit pair. Columns are loaded memory-mapped, so only
+the columns and rows that are used are read from disk, and loading
+needs no unpickling, e.g.
+
+table = load_table('data/XY_results')
+rows = select(table, theta=0.4)
+plt.errorbar(rows['t'], rows['order_parameter'], rows['order_parameter_error'])
+"""
+import os
+import pickle
+import numpy as np
+from disk_cache import atomic_directory
+
+
+def write_table(directory, columns):
+    # Writes the dict of equally long 1d arrays columns as the table directory,
+    # replacing an existing table, atomically (see disk_cache.py).
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+    if len({len(values) for values in columns.values()}) > 1:
+        raise ValueError('All columns must have the same length')
+    with atomic_directory(directory, replace=True) as tmp:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, name + '.npy'), values, allow_pickle=False)
+
+
+def load_table(directory, mmap_mode='r'):
+    # The columns of the table as a dict of memory-mapped arrays.
+    return {
+        filename[:-4]: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode, allow_pickle=False)
+        for filename in sorted(os.listdir(directory)) if filename.endswith('.npy')
+    }
+
+
+def select(table, **where):
+    # The rows of the table whose columns equal the given values, e.g. select(table, theta=0.4).
+    mask = np.ones(len(next(iter(table.values()))), dtype=bool)
+    for name, value in where.items():
+        mask &= np.isclose(table[name], value) if np.issubdtype(table[name].dtype, np.floating) \
+            else table[name] == value
+    return {name: np.asarray(values[mask]) for name, values in table.items()}
+
+
+def table_from_pickles(filenames):
+    # Columns of the table from the per-theta pickles data/XY_theta=....pkl that
+    # script #06 used to write. Only use this on pickles that you trust.
+    columns = {name: [] for name in ['theta', 'Lx', 'Ly', 'dt', 'n_steps', 't', 'order_parameter',
+                                     'order_parameter_error']}
+    for filename in filenames:
+        with open(filename, 'rb') as file:
+            data = pickle.load(file)
+        n = len(data['ts'])
+        columns['theta'] += [float(data['theta'])] * n
+        columns['Lx'] += [data['Lx']] * n
+        columns['Ly'] += [data['Ly']] * n
+        columns['dt'] += [data['dt']] * n
+        columns['n_steps'] += [int(round(t / data['dt'])) for t in data['ts']]
+        columns['t'] += list(data['ts'])
+        columns['order_parameter'] += list(data['order_parameters'])
+        columns['order_parameter_error'] += list(data['order_parameter_errorbars'])
+    return {name: np.array(values) for name, values in columns.items()}
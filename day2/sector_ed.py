@@ -0,0 +1,119 @@
+"""
+Exact diagonalisation of the XY model block by block in its
+symmetry sectors, see scripts #01 and #02.
+
+The XY Hamiltonian conserves the total Sz (i.e. Nup, the number
+of up spins) and, with periodic boundaries, is invariant under
+lattice translations. Each (Nup, momentum) block is built with
+quspin's spin_basis_general and diagonalised independently in a
+process pool, whose workers are limited to threads_per_worker BLAS
+threads each (see sweep_executor.spawn_pool). Only the eigenvalues
+and the diagonals <k|O|k> of the observables are sent back and
+merged, which are all that the microcanonical sweep in
+microcanonical.py needs, e.g.
+
+result = sector_eigh(N, xy_static(couplings), {'order_parameter': order_parameter_static(N)},
+                     translations=get_translations(lattice))
+microcanonical_sweep(result['E'], result['observables']['order_parameter'], energy_centers, variance)
+
+The observables must conserve the same symmetries as the Hamiltonian,
+as does the order parameter Sx^2 + Sy^2.
+"""
+from itertools import product
+import os
+import numpy as np
+from sweep_executor import spawn_pool
+
+
+def xy_static(couplings, J=-1.0):
+    # quspin static list of the XY Hamiltonian J sum_<ij> (X_i X_j + Y_i Y_j)
+    terms = [[J, int(i), int(j)] for i, j in couplings]
+    return [["xx", terms], ["yy", terms]]
+
+
+def order_parameter_static(N):
+    # quspin static list of (Sx^2 + Sy^2)/N^2 with Sx = sum_i X_i,
+    # using X_i X_i = Y_i Y_i = 1 for the diagonal terms.
+    terms = [[1.0 / N ** 2, i, j] for i in range(N) for j in range(N) if i != j]
+    return [["xx", terms], ["yy", terms], ["I", [[2.0 / N, 0]]]]
+
+
+def get_sectors(N, Nup=None, translations=None):
+    # All (Nup, momenta) blocks, where momenta holds one momentum
+    # k = 0, ..., L-1 for each translation in translations.
+    translations = translations or {}
+    Nups = range(N + 1) if Nup is None else np.atleast_1d(Nup)
+    ks = product(*[range(L) for (_, L) in translations.values()])
+    return [(int(nup), k) for k, nup in product(list(ks), Nups)]
+
+
+def _diagonalise_sector(N, Nup, momenta, translations, H_static, observables, dtype):
+    from quspin.basis import spin_basis_general
+    from quspin.operators import hamiltonian
+
+    blocks = {'k{}block'.format(d): (perm, k) for (d, (perm, _)), k in zip(translations.items(), momenta)}
+    basis = spin_basis_general(N, Nup=Nup, **blocks)
+    if basis.Ns == 0:
+        return None
+    checks = dict(check_herm=False, check_symm=False, check_pcon=False)
+    H = hamiltonian(H_static, [], basis=basis, dtype=dtype, **checks)
+    E, V = H.eigh()
+    diagonals = {}
+    for name, static in observables.items():
+        O = hamiltonian(static, [], basis=basis, dtype=dtype, **checks)
+        diagonals[name] = np.real(np.einsum('ik,ik->k', V.conj(), O.dot(V)))
+    return E, diagonals
+
+
+def sector_eigh(N, H_static, observables=None, Nup=None, translations=None, max_workers=None, threads_per_worker=1,
+                dtype=np.complex128):
+    # Diagonalises H_static in all symmetry sectors concurrently and merges the results.
+    # N: number of qubits
+    # H_static, observables: quspin static lists, observables is a dict {name: static list}
+    # Nup: restrict to one (or a list of) Nup sector(s), all by default
+    # translations: {direction: (permutation, length)}, e.g. from tenpy_lattice_adapter.get_translations
+    # max_workers: number of processes, os.cpu_count() // threads_per_worker by default
+    # threads_per_worker: BLAS/OpenMP threads of each process
+    # Returns a dict with the eigenvalues 'E' in ascending order, the matching diagonals of the
+    # observables in 'observables', the list of 'sectors' and the 'sector' index of each eigenvalue.
+    observables = observables or {}
+    translations = {d: (np.asarray(perm), L) for d, (perm, L) in (translations or {}).items()}
+    sectors = get_sectors(N, Nup, translations)
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    with spawn_pool(max_workers, threads_per_worker) as pool:
+        futures = [pool.submit(_diagonalise_sector, N, Nup_, momenta, translations, H_static, observables, dtype)
+                   for Nup_, momenta in sectors]
+        results = [future.result() for future in futures]
+
+    kept = [(s, r) for s, r in enumerate(results) if r is not None]
+    E = np.concatenate([r[0] for _, r in kept])
+    sector = np.concatenate([np.full(len(r[0]), s) for s, r in kept])
+    merged = {name: np.concatenate([r[1][name] for _, r in kept]) for name in observables}
+
+    idx = np.argsort(E, kind='stable')
+    return {
+        'E': E[idx],
+        'observables': {name: diagonal[idx] for name, diagonal in merged.items()},
+        'sectors': sectors,
+        'sector': sector[idx],
+    }
+
+
+if __name__ == '__main__':
+    from time import time
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings, get_translations
+    from microcanonical import microcanonical_sweep
+
+    Lx, Ly = 4, 4
+    N = Lx * Ly
+    lattice = Square(Lx, Ly, None, bc='periodic')
+    t0 = time()
+    result = sector_eigh(N, xy_static(get_qubit_couplings(lattice)),
+                         {'order_parameter': order_parameter_static(N)},
+                         translations=get_translations(lattice))
+    print('{}x{}: {} eigenvalues in {} sectors in {:.1f}s'.format(
+        Lx, Ly, len(result['E']), len(result['sectors']), time() - t0))
+    energy_centers = np.linspace(min(result['E']), max(result['E']), 30)
+    print(microcanonical_sweep(result['E'], result['observables']['order_parameter'], energy_centers, N * 4 / 3))
@@ -0,0 +1,68 @@
+"""
+Turns the measured counts of the XY model circuits into
+expectation values with error bars, see script #06.
+
+The counts are converted once into a (n_outcomes, N) uint8 array
+of the distinct readouts and a vector of their frequencies, from
+which the magnetisation s = sum_i (1 - 2 b_i) / N of every outcome
+follows from one matrix product. All moments <s^k>, their standard
+errors and the Binder cumulant then only need a few weighted sums
+over the outcomes, instead of python loops over the shots.
+"""
+import numpy as np
+
+
+def counts_to_arrays(counts):
+    # The distinct bitstrings of counts (a dict {bitstring: frequency}) as
+    # a (n_outcomes, N) uint8 array, and their frequencies.
+    readouts = np.array(list(counts.keys()), dtype=np.uint8)
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    return readouts.reshape(len(weights), -1), weights
+
+
+def magnetisation(readouts):
+    # s = sum_i (1 - 2 b_i) / N for each row of readouts.
+    N = readouts.shape[1]
+    return 1 - 2 * (readouts @ np.ones(N)) / N
+
+
+def _weighted_mean_and_error(values, weights, total_shots):
+    # Mean and standard error of the mean of the shots, with the (n - 1) standard deviation.
+    mean = weights @ values / total_shots
+    if total_shots < 2:
+        return mean, np.nan
+    variance = weights @ (values - mean) ** 2 / (total_shots - 1)
+    return mean, np.sqrt(variance / total_shots)
+
+
+def moments_from_readouts(readouts, weights, moments=(1, 2, 4)):
+    # Returns {k: (<s^k>, standard error)} for each k in moments and, if 2 and 4 are
+    # among them, 'binder': (U, standard error) with the Binder cumulant
+    # U = 1 - <s^4> / (3 <s^2>^2), whose error follows from the covariance of s^2 and s^4.
+    weights = np.asarray(weights)
+    total_shots = int(weights.sum())
+    s = magnetisation(readouts)
+    result = {k: _weighted_mean_and_error(s ** k, weights, total_shots) for k in moments}
+    if 2 in result and 4 in result:
+        m2 = result[2][0]
+        m4 = result[4][0]
+        binder = 1 - m4 / (3 * m2 ** 2)
+        error = np.nan
+        if total_shots > 1:
+            samples = np.stack([s ** 2 - m2, s ** 4 - m4])
+            covariance = (samples * weights) @ samples.T / (total_shots - 1)
+            gradient = np.array([2 * m4 / (3 * m2 ** 3), -1 / (3 * m2 ** 2)])
+            error = np.sqrt(gradient @ covariance @ gradient / total_shots)
+        result['binder'] = (binder, error)
+    return result
+
+
+def moments_from_counts(counts, moment=2):
+    #1 is mean <X>
+    #2 is structure factor <X^2>
+    # Returns (mean, standard error), or only the mean for a single shot.
+    readouts, weights = counts_to_arrays(counts)
+    mean, standard_error = moments_from_readouts(readouts, weights, (moment,))[moment]
+    if weights.sum() > 1:
+        return mean, standard_error
+    return mean
@@ -0,0 +1,145 @@
+"""
+Runs independent points of a parameter sweep, e.g. over lattice
+sizes and theta, in a process pool instead of plain for loops.
+
+Each point is a dict of keyword arguments for the point function,
+by default xy_point, which evolves the XY model as in script #03.
+Results are appended to a JSON lines results table as soon as each
+point finishes, and points that are already in the table are
+skipped, so an interrupted sweep can simply be restarted. A point
+that raises is recorded with its error instead of a result, the other
+points carry on, and failed points are run again on a restart, e.g.
+
+points = parameter_grid(shape=[(3, 3), (4, 4)], theta=np.linspace(0, np.pi/8, 5), dt=[0.2], Tmax=[20])
+run_sweep(points, results_file='sweep_results.jsonl', max_workers=8, threads_per_worker=8)
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from itertools import product
+import json
+import multiprocessing
+import os
+import numpy as np
+
+# Environment variables that limit the threads of BLAS, OpenMP (quspin, Aer) and numba.
+THREAD_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS', 'NUMBA_NUM_THREADS']
+
+
+def _limit_threads(threads):
+    # Pool initializer that sets the thread limits in the environment of the worker,
+    # for the libraries that read them when they are loaded or first used (OpenMP in
+    # quspin and Aer, numba, BLAS if numpy is not imported yet). BLAS libraries that
+    # are loaded already, e.g. by the main module, are limited with threadpoolctl if
+    # it is installed.
+    os.environ.update({name: str(threads) for name in THREAD_VARIABLES})
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(threads)
+
+
+@contextmanager
+def spawn_pool(max_workers, threads_per_worker=1):
+    # ProcessPoolExecutor with spawned workers, each limited to threads_per_worker
+    # threads by the initializer _limit_threads. The environment of this process is
+    # left alone.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_limit_threads,
+                             initargs=(threads_per_worker,)) as pool:
+        yield pool
+
+
+def parameter_grid(**axes):
+    # All combinations of the given values, as a list of dicts, e.g.
+    # parameter_grid(theta=[0, 0.4], dt=[0.2]) -> [{'theta': 0, 'dt': 0.2}, {'theta': 0.4, 'dt': 0.2}]
+    names = list(axes)
+    return [dict(zip(names, values)) for values in product(*axes.values())]
+
+
+def xy_point(shape, theta, dt, Tmax, bc='periodic'):
+    # Order parameter after each Trotter step and energy of the initial
+    # product state with angle theta on a shape = (Lx, Ly) square lattice.
+    from pytket import Circuit
+    from native_lattice import Square
+    from tenpy_lattice_adapter import get_qubit_couplings
+    from xy_circuits import evolve_statevector, XY_step
+    from numpy_statevector import order_parameter, xy_energy
+
+    Lx, Ly = shape
+    N = Lx * Ly
+    couplings = get_qubit_couplings(Square(Lx, Ly, None, bc=bc))
+    qc = Circuit(N)
+    for j in range(N):
+        qc.H(j)
+        qc.Ry(theta * 2 / np.pi, j)
+    order_parameters = []
+    for t, sv in enumerate(evolve_statevector(qc, XY_step(dt, couplings), Tmax - 1)):
+        if t == 0:
+            energy = xy_energy(sv, couplings)
+        order_parameters.append(order_parameter(sv))
+    return {'energy': float(energy), 'order_parameters': [float(o) for o in order_parameters]}
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return [_to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _key(point):
+    return json.dumps(_to_json(point), sort_keys=True)
+
+
+def load_results(results_file, errors=False):
+    # All records {'point': ..., 'result': ...} in the results table, or with
+    # errors=True the records {'point': ..., 'error': ...} of the failed points.
+    if not os.path.exists(results_file):
+        return []
+    with open(results_file) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return [record for record in records if ('error' in record) == errors]
+
+
+def run_sweep(points, function=xy_point, results_file='sweep_results.jsonl', max_workers=None,
+              threads_per_worker=1):
+    # Evaluates function(**point) for all points in a pool of max_workers processes
+    # (os.cpu_count() // threads_per_worker by default), each limited to
+    # threads_per_worker threads for BLAS/OpenMP. function must be importable,
+    # i.e. defined at the top level of a module. Returns all successful records
+    # of the table, see load_results(results_file, errors=True) for the failures.
+    done = {_key(record['point']) for record in load_results(results_file)}
+    todo = [point for point in points if _key(point) not in done]
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    with spawn_pool(max_workers, threads_per_worker) as pool:
+        futures = {pool.submit(function, **point): point for point in todo}
+        with open(results_file, 'a') as file:
+            for future in as_completed(futures):
+                point = futures[future]
+                try:
+                    record = {'point': _to_json(point), 'result': _to_json(future.result())}
+                    print('Finished {}'.format(point))
+                except Exception as error:
+                    record = {'point': _to_json(point), 'error': repr(error)}
+                    print('Failed {}: {!r}'.format(point, error))
+                file.write(json.dumps(record) + '\n')
+                file.flush()
+    return load_results(results_file)
+
+
+if __name__ == '__main__':
+    points = parameter_grid(shape=[(3, 3), (4, 3)], theta=np.linspace(0, np.pi / 8, 5), dt=[0.2], Tmax=[20])
+    records = run_sweep(points)
+    for record in records:
+        print(record['point'], record['result']['order_parameters'][-1])
@@ -1,7 +1,9 @@
 #Tenpy can be installed with pip install physics-tenpy
-from tenpy.models import lattice
+#It is only needed for drawing lattices, the couplings also work
+#with the tenpy-free lattices in native_lattice.py.
 import numpy as np
-import matplotlib.pyplot as plt
+import sys
+from time import perf_counter
 
 
 def coordinate2qubit_mapping(lattice):
@@ -18,34 +20,277 @@ def qubit2coordinate(lattice):
         #print('Site [X,Y,U] = {} is mapped to qubit {}'.format(site, e))
     return mapping
 
+def coordinate2qubit_index(lattice):
+    # Dense lookup table such that index[x, y, u] is the qubit of site [X,Y,U].
+    # Built in a single pass over lattice.order, so looking up a batch of
+    # sites is one fancy-indexing operation instead of a scan per site.
+    shape = tuple(lattice.Ls) + (max(lattice.order[:, -1]) + 1,)
+    index = np.full(shape, -1, dtype=np.intp)
+    index[tuple(lattice.order.T)] = np.arange(len(lattice.order))
+    return index
+
 
 def get_qubit_couplings(lattice, which='nearest_neighbors'):
+    # Returns all couplings as an (n_bonds, 2) integer array of qubit indices.
+    # Works with tenpy lattices and the lattices in native_lattice.py.
     couplings = lattice.pairs[which]
-    unit_cell_size = max(lattice.order[:, 2]) + 1
+    index = coordinate2qubit_index(lattice)
+    periodic = np.logical_not(lattice.bc)
 
-    qubit_couplings = []
+    qubit_couplings = [np.zeros((0, 2), dtype=np.intp)]
     for u1, u2, dx in couplings:
         dx = np.r_[np.array(dx), u2 - u1]
-        lat_idx_1 = lattice.order[lattice._mps_fix_u[u1], :]
+        lat_idx_1 = lattice.order[lattice.order[:, -1] == u1, :]
         lat_idx_2 = lat_idx_1 + dx[np.newaxis, :]
-        lat_idx_2_mod = np.mod(lat_idx_2[:, :-1], lattice.Ls)
-        keep = lattice._keep_possible_couplings(lat_idx_2_mod, lat_idx_2[:, :-1], u2)
-
-        lat_idx_2_mod = np.mod(lat_idx_2, (lattice.Ls[0], lattice.Ls[1], unit_cell_size))
+        lat_idx_2_mod = np.mod(lat_idx_2, index.shape)
+        # Drop couplings across open boundaries.
+        keep = np.all(np.logical_or(lat_idx_2_mod[:, :-1] == lat_idx_2[:, :-1], periodic), axis=1)
 
         sites1 = lat_idx_1[keep, :]
-        sites2 = lat_idx_2[keep, :]
         sites2_mod = lat_idx_2_mod[keep, :]
 
-        for s1, s2 in zip(sites1, sites2_mod):
-            qubit1 = np.where((lattice.order == s1).all(axis=1))[0][0]
-            qubit2 = np.where((lattice.order == s2).all(axis=1))[0][0]
-            qubit_couplings.append([qubit1, qubit2])
-        #print('Couplings: {}'.format(qubit_couplings))
-    return qubit_couplings
+        qubit1 = index[tuple(sites1.T)]
+        qubit2 = index[tuple(sites2_mod.T)]
+        qubit_couplings.append(np.stack([qubit1, qubit2], axis=1))
+    #print('Couplings: {}'.format(qubit_couplings))
+    return np.concatenate(qubit_couplings, axis=0)
+
+
+def get_translations(lattice):
+    # Qubit permutations that translate the lattice by one unit cell, for each
+    # periodic direction, i.e. translations[d][q] is the qubit that qubit q
+    # is mapped to. Returns a dict {direction: (permutation, length)}.
+    index = coordinate2qubit_index(lattice)
+    translations = {}
+    for d, L in enumerate(lattice.Ls):
+        if lattice.bc[d]:
+            continue
+        sites = lattice.order.copy()
+        sites[:, d] = (sites[:, d] + 1) % L
+        translations[d] = (index[tuple(sites.T)], int(L))
+    return translations
+
+
+def _other(edge, v):
+    return edge[1] if edge[0] == v else edge[0]
+
+
+def _free_colour(at, v, n_colours):
+    for c in range(n_colours):
+        if c not in at[v]:
+            return c
+
+
+def _alternating_path(at, edges, v, a, b):
+    # Bonds (as indices into edges) of the path that starts at qubit v with
+    # the bond coloured a and then alternates between colours a and b.
+    path = []
+    colour = a
+    while colour in at[v]:
+        e = at[v][colour]
+        path.append(e)
+        v = _other(edges[e], v)
+        colour = b if colour == a else a
+    return path
+
+
+def _swap_colours(at, edges, colours, path, a, b):
+    for e in path:
+        for v in edges[e]:
+            del at[v][colours[e]]
+    for e in path:
+        colours[e] = b if colours[e] == a else a
+        for v in edges[e]:
+            at[v][colours[e]] = e
+
+
+def _set_colour(at, edges, colours, e, colour):
+    colours[e] = colour
+    for v in edges[e]:
+        at[v][colour] = e
+
+
+def _kempe_colouring(edges, n_qubits, n_colours):
+    # Tries to colour the bonds with n_colours colours by swapping Kempe chains.
+    # With n_colours equal to the maximal degree this always succeeds on
+    # bipartite graphs (square lattices with even periodic sizes, honeycomb
+    # lattices, ...) and returns None if it gets stuck otherwise.
+    at = [dict() for _ in range(n_qubits)]
+    colours = [None] * len(edges)
+    for e, (u, v) in enumerate(edges):
+        free_u = [c for c in range(n_colours) if c not in at[u]]
+        free_v = [c for c in range(n_colours) if c not in at[v]]
+        common = [c for c in free_u if c in free_v]
+        if common:
+            _set_colour(at, edges, colours, e, common[0])
+            continue
+        for a in free_u:
+            for b in free_v:
+                path = _alternating_path(at, edges, v, a, b)
+                if all(u not in edges[f] for f in path):
+                    _swap_colours(at, edges, colours, path, a, b)
+                    _set_colour(at, edges, colours, e, a)
+                    break
+            else:
+                continue
+            break
+        else:
+            return None
+    return colours
+
+
+def _misra_gries_colouring(edges, n_qubits, n_colours):
+    # Misra-Gries edge colouring, which always succeeds with n_colours equal
+    # to the maximal degree + 1 (Vizing's theorem).
+    at = [dict() for _ in range(n_qubits)]
+    colours = [None] * len(edges)
+    for e, (x, f) in enumerate(edges):
+        # Maximal fan of x, starting with the uncoloured bond e.
+        fan = [e]
+        while True:
+            last = _other(edges[fan[-1]], x)
+            for colour, g in at[x].items():
+                if g not in fan and colour not in at[last]:
+                    fan.append(g)
+                    break
+            else:
+                break
+        c = _free_colour(at, x, n_colours)
+        d = _free_colour(at, _other(edges[fan[-1]], x), n_colours)
+        if c != d:
+            _swap_colours(at, edges, colours, _alternating_path(at, edges, x, d, c), c, d)
+
+        # Rotate the longest prefix that is still a fan and ends on a qubit
+        # on which d is free, then colour its last bond with d.
+        for i, g in enumerate(fan):
+            if i > 0 and colours[g] in at[_other(edges[fan[i - 1]], x)]:
+                break
+            if d not in at[_other(edges[g], x)]:
+                end = i
+                break
+        for i in range(end):
+            colour = colours[fan[i + 1]]
+            for v in edges[fan[i + 1]]:
+                del at[v][colour]
+            _set_colour(at, edges, colours, fan[i], colour)
+        _set_colour(at, edges, colours, fan[end], d)
+    return colours
+
+
+def _equalise_colours(edges, n_qubits, colours, n_colours):
+    # Moves bonds from the largest to the smallest colour by swapping both
+    # colours on a path of their union that has more bonds of the largest
+    # colour, until the sizes of all colours differ by at most one.
+    # Such a path starts and ends on a bond of the largest colour, at a qubit
+    # without a bond of the smallest colour. The colour maps and the bonds of
+    # each colour are kept up to date as bonds move, instead of being rebuilt.
+    at = [dict() for _ in range(n_qubits)]
+    members = [set() for _ in range(n_colours)]
+    for e, colour in enumerate(colours):
+        _set_colour(at, edges, colours, e, colour)
+        members[colour].add(e)
+    while True:
+        sizes = [len(m) for m in members]
+        big = max(range(n_colours), key=sizes.__getitem__)
+        small = min(range(n_colours), key=sizes.__getitem__)
+        if sizes[big] - sizes[small] <= 1:
+            return colours
+        path = None
+        for e in members[big]:
+            for v in edges[e]:
+                if small not in at[v]:
+                    path = _alternating_path(at, edges, v, big, small)
+                    if len(path) % 2 == 1:
+                        break
+                    path = None
+            if path is not None:
+                break
+        _swap_colours(at, edges, colours, path, big, small)
+        for e in path:
+            members[small if colours[e] == big else big].remove(e)
+            members[colours[e]].add(e)
+
+
+def schedule_couplings(couplings, max_gates_per_layer=None):
+    # Splits the couplings into layers of disjoint couplings, i.e. an edge
+    # colouring of the interaction graph. All gates in a layer can run in
+    # parallel, so the number of layers is the two-qubit gate depth of one
+    # sweep over the couplings. This is the maximal number of couplings per
+    # qubit if possible and one more otherwise (as e.g. for odd periodic
+    # chains, where that is the minimum).
+    # max_gates_per_layer caps the number of gates per layer, e.g. to the
+    # number of gate zones of the device. Returns a list of (n_gates, 2)
+    # arrays, with couplings in the order of get_qubit_couplings.
+    # Repeated bonds, e.g. (i, j) and (j, i) on small periodic lattices,
+    # are scheduled once, as their first occurrence. Bonds of a qubit with
+    # itself raise a ValueError.
+    couplings = np.asarray(couplings, dtype=np.intp).reshape(-1, 2)
+    if len(couplings) == 0:
+        return []
+    if np.any(couplings[:, 0] == couplings[:, 1]):
+        raise ValueError('Cannot schedule couplings of a qubit with itself: {}'.format(
+            couplings[couplings[:, 0] == couplings[:, 1]].tolist()))
+    _, first = np.unique(np.sort(couplings, axis=1), axis=0, return_index=True)
+    couplings = couplings[np.sort(first)]
+    edges = [(int(u), int(v)) for u, v in couplings]
+    n_qubits = int(couplings.max()) + 1
+    n_colours = int(max(np.bincount(couplings.ravel())))
+
+    colours = _kempe_colouring(edges, n_qubits, n_colours)
+    if colours is None:
+        n_colours = n_colours + 1
+        colours = _misra_gries_colouring(edges, n_qubits, n_colours)
+
+    if max_gates_per_layer is not None:
+        n_colours = max(n_colours, -(-len(edges) // max_gates_per_layer))
+        colours = _equalise_colours(edges, n_qubits, colours, n_colours)
+
+    colours = np.array(colours)
+    layers = [couplings[colours == c] for c in range(n_colours)]
+    return [layer for layer in layers if len(layer)]
+
+
+def coupling_layers(couplings, max_gates_per_layer=None):
+    # Layers of disjoint couplings for an (n_bonds, 2) array of couplings as returned
+    # by get_qubit_couplings, see schedule_couplings. A list of layers as returned by
+    # schedule_couplings is passed through unchanged, unless max_gates_per_layer is given.
+    if isinstance(couplings, (list, tuple)) and len(couplings) and all(np.ndim(layer) == 2 for layer in couplings):
+        if max_gates_per_layer is None:
+            return list(couplings)
+        couplings = np.concatenate(couplings)
+    couplings = np.asarray(couplings)
+    if couplings.size and (couplings.ndim != 2 or couplings.shape[1] != 2):
+        raise ValueError('Expected couplings as an (n_bonds, 2) array or a list of such layers, '
+                         'got an array of shape {}'.format(couplings.shape))
+    return schedule_couplings(couplings, max_gates_per_layer)
+
+
+def benchmark_qubit_couplings(sizes=(10, 20, 40, 80), lattice_class=None, repeats=3):
+    # Times get_qubit_couplings on L x L lattices with periodic boundaries and
+    # fits the slope of log(time) vs log(N); a slope close to 1 means linear scaling.
+    if lattice_class is None:
+        from native_lattice import Honeycomb as lattice_class
+    Ns = []
+    times = []
+    for L in sizes:
+        lat = lattice_class(L, L, None, bc='periodic')
+        best = np.inf
+        for _ in range(repeats):
+            t0 = perf_counter()
+            get_qubit_couplings(lat)
+            best = min(best, perf_counter() - t0)
+        Ns.append(lat.N_sites)
+        times.append(best)
+        print('N = {:6d} sites: {:.2e} s'.format(lat.N_sites, best))
+    slope = np.polyfit(np.log(Ns), np.log(times), 1)[0]
+    print('Scaling exponent time ~ N^{:.2f}'.format(slope))
+    return Ns, times
 
 
 def draw_lattice(lat):
+    import matplotlib.pyplot as plt
+    if hasattr(lat, 'to_tenpy'):
+        lat = lat.to_tenpy()
     fig = plt.figure()
     ax = plt.gca()
     lat.plot_coupling(ax, linestyle='-', linewidth=2)
@@ -55,7 +300,12 @@ def draw_lattice(lat):
     plt.show()
 
 if __name__ == '__main__':
+    if 'benchmark' in sys.argv[1:]:
+        benchmark_qubit_couplings()
+        sys.exit()
+    from tenpy.models import lattice
     lat = lattice.Honeycomb(5, 5, None, bc='periodic', order='default')
     print('Coordinate to qubit mapping is {}'.format(coordinate2qubit_mapping(lat)))
     print('Paralellized Qubit Couplings are {}'.format(get_qubit_couplings(lat)))
-    draw_lattice(lat)
\ No newline at end of file
+    print('Parallel layers of couplings are {}'.format(schedule_couplings(get_qubit_couplings(lat))))
+    draw_lattice(lat)
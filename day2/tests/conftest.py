@@ -0,0 +1,6 @@
+# The helper modules in day2/ import each other by bare module name, as when
+# the scripts are run from day2/, so the tests put day2/ on the path.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from counts_store import _filename, load_counts, pack_readouts, store_counts, unpack_readouts
+
+
+@pytest.mark.parametrize('n_bits, dtype, n_words', [(1, np.uint8, 1), (8, np.uint8, 1), (9, np.uint16, 1),
+                                                    (20, np.uint32, 1), (40, np.uint64, 1), (130, np.uint64, 3)])
+def test_pack_readouts(n_bits, dtype, n_words):
+    readouts = np.random.default_rng(n_bits).integers(0, 2, (50, n_bits)).astype(np.uint8)
+    packed = pack_readouts(readouts)
+    assert packed.dtype == dtype and packed.shape == (50, n_words)
+    assert np.array_equal(unpack_readouts(packed, n_bits), readouts)
+
+
+def test_store_and_load_counts(tmp_path):
+    readouts = np.array([[0, 1, 1], [1, 0, 0]], dtype=np.uint8)
+    counts = np.array([7, 3])
+    store_counts(('job', 1), readouts, counts, str(tmp_path))
+    loaded_readouts, loaded_counts = load_counts(('job', 1), str(tmp_path))
+    assert np.array_equal(loaded_readouts, readouts) and np.array_equal(loaded_counts, counts)
+    assert load_counts(('job', 2), str(tmp_path)) is None
+
+
+def test_load_counts_before_bit_packing(tmp_path):
+    # Entries written before bit-packing hold the unpacked readouts.
+    readouts = np.array([[0, 1, 1], [1, 0, 0]], dtype=np.uint8)
+    counts = np.array([7, 3])
+    np.savez(_filename(('job', 1), str(tmp_path)), readouts=readouts, counts=counts, handle=str(('job', 1)))
+    loaded_readouts, loaded_counts = load_counts(('job', 1), str(tmp_path))
+    assert np.array_equal(loaded_readouts, readouts) and np.array_equal(loaded_counts, counts)
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from disk_cache import atomic_directory, atomic_file, evict
+from eigh_cache import get_or_compute
+
+
+def _write(path, n_bytes, mtime):
+    with open(path, 'wb') as file:
+        file.write(b'0' * n_bytes)
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    for i, key in enumerate(['a', 'b', 'c', 'd']):
+        _write(tmp_path / (key + '.json'), 100, 1000 + i)
+    _write(tmp_path / '.tmp-in-progress', 1000, 0)
+    evict(str(tmp_path), 250, keep={'a'}, suffix='.json')
+    assert sorted(os.listdir(tmp_path)) == ['.tmp-in-progress', 'a.json', 'd.json']
+
+
+def test_eigh_cache_evicts_old_entries(tmp_path):
+    cache_dir = str(tmp_path)
+    E, V = np.arange(4.0), np.eye(4)
+    size = E.nbytes + V.nbytes + 2 * 128  # .npy headers
+    get_or_compute('first', lambda: (E, V), cache_dir, max_bytes=size)
+    get_or_compute('second', lambda: (E, V), cache_dir, max_bytes=size)
+    assert os.listdir(cache_dir) == ['second']
+    E2, V2 = get_or_compute('second', lambda: None, cache_dir)
+    assert np.array_equal(V2, V)
+
+
+def test_atomic_file(tmp_path):
+    path = str(tmp_path / 'entry.json')
+    with atomic_file(path, 'w') as file:
+        file.write('old')
+    with pytest.raises(RuntimeError):
+        with atomic_file(path, 'w') as file:
+            file.write('partial')
+            raise RuntimeError
+    assert os.listdir(tmp_path) == ['entry.json']
+    with open(path) as file:
+        assert file.read() == 'old'
+
+
+def test_atomic_directory(tmp_path):
+    path = str(tmp_path / 'entry')
+    for replace, content in [(False, 'first'), (False, 'second'), (True, 'third')]:
+        with atomic_directory(path, replace=replace) as tmp:
+            _write(os.path.join(tmp, content), 1, 0)
+        assert os.listdir(tmp_path) == ['entry']
+    assert os.listdir(path) == ['third']
@@ -0,0 +1,22 @@
+from pytket.backends import ResultHandle
+
+from job_manifest import JobManifest
+
+
+def _key(basis):
+    return {'theta': 0.4, 'n_steps': 1, 'basis': basis, 'Lx': 3, 'Ly': 3, 'dt': 0.2}
+
+
+def test_failed_jobs_are_filtered_and_resubmitted(tmp_path):
+    manifest = JobManifest(str(tmp_path / 'jobs.sqlite'))
+    manifest.add_jobs([(_key('X'), ResultHandle('a', 1, 2)), (_key('Y'), ResultHandle('b', 1, 3))])
+    manifest.set_status(_key('Y'), 'failed')
+    assert manifest.status(_key('X')) == 'submitted'
+    assert manifest.status(_key('Y')) == 'failed'
+    assert manifest.status(_key('Z')) is None and _key('Z') not in manifest
+    assert [job['basis'] for job in manifest.jobs(status=['submitted', 'done'])] == ['X']
+
+    manifest.add_jobs([(_key('Y'), ResultHandle('c', 1, 4))])
+    jobs = manifest.jobs(status='submitted', basis='Y')
+    assert [job['handle'] for job in jobs] == [ResultHandle('c', 1, 4)]
+    manifest.close()
@@ -0,0 +1,25 @@
+import pytest
+
+from native_lattice import Chain, Honeycomb, Square, Triangular, validate_against_tenpy
+
+pytest.importorskip('tenpy')
+
+
+@pytest.mark.parametrize('bc', ['open', 'periodic'])
+@pytest.mark.parametrize('lattice_class, args', [
+    (Chain, (6,)),
+    (Square, (4, 3)),
+    (Triangular, (4, 3)),
+    (Honeycomb, (3, 4)),
+])
+def test_native_lattices_match_tenpy(lattice_class, args, bc):
+    lattice = lattice_class(*args, None, bc=bc)
+    assert set(lattice.pairs) == {'nearest_neighbors', 'next_nearest_neighbors', 'next_next_nearest_neighbors'}
+    validate_against_tenpy(lattice)
+
+
+def test_validate_against_tenpy_detects_differences():
+    lattice = Square(4, 3, None, bc='periodic')
+    lattice.pairs['nearest_neighbors'] = lattice.pairs['nearest_neighbors'][:1]
+    with pytest.raises(ValueError):
+        validate_against_tenpy(lattice)
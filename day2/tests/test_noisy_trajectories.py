@@ -0,0 +1,23 @@
+import numpy as np
+from pytket import Circuit
+
+from native_lattice import Chain
+from noisy_trajectories import noisy_trajectories
+from tenpy_lattice_adapter import get_qubit_couplings
+from xy_circuits import XY_step
+
+
+def _estimates(seed):
+    couplings = get_qubit_couplings(Chain(4, None, bc='periodic'))
+    qc = Circuit(4)
+    for j in range(4):
+        qc.H(j)
+    noise = {'p1': 0.01, 'p2': 0.05, 'p_meas': 0.01}
+    return list(noisy_trajectories(qc, XY_step(0.2, couplings), 2, couplings, noise, target_error=0.02,
+                                   min_trajectories=20, chunk_size=10, max_workers=2, seed=seed))
+
+
+def test_noisy_trajectories_are_reproducible():
+    first, second = _estimates(7), _estimates(7)
+    assert [e['n_trajectories'] for e in first] == [e['n_trajectories'] for e in second]
+    assert np.array_equal(first[-1]['order_parameter'], second[-1]['order_parameter'])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from native_lattice import Chain, Honeycomb, Square, Triangular
+from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings
+
+LATTICES = [
+    (Square(4, 4, None, bc='periodic'), 'nearest_neighbors'),
+    (Square(3, 3, None, bc='periodic'), 'nearest_neighbors'),
+    (Honeycomb(3, 3, None, bc='periodic'), 'nearest_neighbors'),
+    (Triangular(6, 2, None, bc='periodic'), 'nearest_neighbors'),
+    (Square(3, 2, None, bc='periodic'), 'next_nearest_neighbors'),
+    (Chain(5, None, bc='periodic'), 'nearest_neighbors'),
+]
+
+
+def _bonds(couplings):
+    return sorted(tuple(sorted(bond)) for bond in np.asarray(couplings).tolist())
+
+
+@pytest.mark.parametrize('lattice, which', LATTICES)
+@pytest.mark.parametrize('cap', [None, 1, 2, 3, 5])
+def test_schedule_couplings(lattice, which, cap):
+    couplings = get_qubit_couplings(lattice, which)
+    layers = schedule_couplings(couplings, cap)
+    for layer in layers:
+        assert len(np.unique(layer)) == layer.size
+        if cap is not None:
+            assert len(layer) <= cap
+    scheduled = _bonds(np.concatenate(layers))
+    assert scheduled == sorted(set(_bonds(couplings)))
+
+
+def test_schedule_couplings_rejects_self_loops():
+    with pytest.raises(ValueError):
+        schedule_couplings([[0, 1], [1, 1]])
+
+
+@pytest.mark.parametrize('lattice, n_layers', [
+    (Square(4, 4, None, bc='periodic'), 4),
+    (Square(3, 3, None, bc='open'), 4),
+    (Honeycomb(3, 3, None, bc='periodic'), 3),
+    (Chain(6, None, bc='periodic'), 2),
+    (Chain(5, None, bc='periodic'), 3),
+])
+def test_schedule_couplings_depth(lattice, n_layers):
+    couplings = get_qubit_couplings(lattice)
+    assert len(schedule_couplings(couplings)) == n_layers
+    for cap in [1, 2, 3, 5]:
+        assert len(schedule_couplings(couplings, cap)) == max(n_layers, -(-len(couplings) // cap))
+
+
+def test_schedule_couplings_large_capped():
+    couplings = get_qubit_couplings(Honeycomb(20, 20, None, bc='periodic'))
+    layers = schedule_couplings(couplings, 20)
+    assert len(layers) == len(couplings) // 20
+    assert all(len(layer) == 20 for layer in layers)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from shot_analysis import counts_to_arrays, moments_from_counts, moments_from_readouts
+
+
+def moments_from_counts_loop(counts, moment=2):
+    # The original implementation, one python loop over the outcomes.
+    mean = 0
+    total_shots = 0
+    for bitstring, frequency in counts.items():
+        s = sum([1 - 2 * i for i in bitstring]) / len(bitstring)
+        mean = mean + s ** moment * frequency
+        total_shots = total_shots + frequency
+    mean = mean / total_shots
+    if total_shots > 1:
+        stdev = 0
+        for bitstring, frequency in counts.items():
+            s = sum([1 - 2 * i for i in bitstring]) / len(bitstring)
+            stdev = stdev + (s ** moment - mean) ** 2 * frequency
+        stdev = np.sqrt(stdev / (total_shots - 1))
+        return mean, stdev / np.sqrt(total_shots)
+    return mean
+
+
+def _counts(n_bits=6, n_shots=2000, seed=0):
+    # Correlated shots, so that s is not centred on 0.
+    rng = np.random.default_rng(seed)
+    p = rng.uniform(0.1, 0.4)
+    shots = (rng.random((n_shots, n_bits)) < p).astype(int)
+    shots[rng.random(n_shots) < 0.3] ^= 1
+    counts = {}
+    for shot in map(tuple, shots):
+        counts[shot] = counts.get(shot, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize('moment', [1, 2, 4])
+def test_moments_match_loop(moment):
+    counts = _counts()
+    readouts, weights = counts_to_arrays(counts)
+    expected = moments_from_counts_loop(counts, moment)
+    assert np.allclose(moments_from_readouts(readouts, weights, (moment,))[moment], expected)
+    assert np.allclose(moments_from_counts(counts, moment), expected)
+
+
+def test_single_shot():
+    counts = {(0, 1, 1): 1}
+    assert np.isclose(moments_from_counts(counts, 2), moments_from_counts_loop(counts, 2))
+
+
+def test_binder_cumulant_and_error():
+    counts = _counts()
+    readouts, weights = counts_to_arrays(counts)
+    binder, error = moments_from_readouts(readouts, weights)['binder']
+    s = np.repeat(1 - 2 * readouts.sum(axis=1) / readouts.shape[1], weights)
+    assert np.isclose(binder, 1 - np.mean(s ** 4) / (3 * np.mean(s ** 2) ** 2))
+
+    # The propagated error agrees with a bootstrap over the shots.
+    rng = np.random.default_rng(1)
+    samples = s[rng.integers(0, len(s), (1000, len(s)))]
+    bootstrap = 1 - np.mean(samples ** 4, axis=1) / (3 * np.mean(samples ** 2, axis=1) ** 2)
+    assert np.isclose(error, np.std(bootstrap), rtol=0.15)
@@ -0,0 +1,31 @@
+import os
+
+from sweep_executor import load_results, parameter_grid, run_sweep, spawn_pool
+
+
+def square_or_fail(x):
+    if x == 2:
+        raise ValueError('x = 2')
+    return x ** 2
+
+
+def test_run_sweep_records_failures_and_retries_them(tmp_path):
+    results_file = str(tmp_path / 'results.jsonl')
+    points = parameter_grid(x=[0, 1, 2, 3])
+    records = run_sweep(points, square_or_fail, results_file, max_workers=1)
+    assert sorted((r['point']['x'], r['result']) for r in records) == [(0, 0), (1, 1), (3, 9)]
+    failures = load_results(results_file, errors=True)
+    assert [r['point'] for r in failures] == [{'x': 2}]
+    assert 'x = 2' in failures[0]['error']
+
+    # Only the failed point is run again on a restart.
+    run_sweep(points, square_or_fail, results_file, max_workers=1)
+    assert len(load_results(results_file)) == 3
+    assert len(load_results(results_file, errors=True)) == 2
+
+
+def test_spawn_pool_limits_threads_of_the_workers_only():
+    before = os.environ.get('OMP_NUM_THREADS')
+    with spawn_pool(1, threads_per_worker=3) as pool:
+        assert pool.submit(os.getenv, 'OMP_NUM_THREADS').result() == '3'
+        assert os.environ.get('OMP_NUM_THREADS') == before
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from pytket import Circuit
+
+from native_lattice import Square
+from tenpy_lattice_adapter import get_qubit_couplings, schedule_couplings
+from xy_circuits import evolve_statevector, get_statevector, XY_step
+
+
+def test_evolve_statevector_yields_each_step():
+    layers = schedule_couplings(get_qubit_couplings(Square(2, 2, None, bc='open')))
+    qc = Circuit(4)
+    for j in range(4):
+        qc.H(j)
+        qc.Ry(0.3, j)
+    step = XY_step(0.2, layers)
+    states = list(evolve_statevector(qc, step, 3, precision='double'))
+    assert len(states) == 4
+    reference = qc.copy()
+    for t, sv in enumerate(states):
+        if t > 0:
+            reference.append(step)
+        assert np.allclose(sv, get_statevector(reference, precision='double', simulator='aer'))
+
+
+def test_XY_step_schedules_couplings():
+    couplings = get_qubit_couplings(Square(3, 3, None, bc='periodic'))
+    step = XY_step(0.2, couplings)
+    assert step.get_commands() == XY_step(0.2, schedule_couplings(couplings)).get_commands()
+    capped = XY_step(0.2, couplings, max_gates_per_layer=2)
+    assert capped.get_commands() == XY_step(0.2, schedule_couplings(couplings, 2)).get_commands()
+
+
+def test_XY_step_rejects_other_shapes():
+    with pytest.raises(ValueError):
+        XY_step(0.2, np.arange(6))
@@ -0,0 +1,166 @@
+"""
+Helpers to build and simulate the XY model Trotter circuits,
+shared by scripts #03 and #04 and the benchmarks.
+"""
+from pytket import Circuit
+import numpy as np
+from collections import defaultdict
+from numpy_statevector import simulate, compile_circuit, apply_gates
+
+# qiskit, Aer and pytket.utils take seconds to import, so they are only imported
+# by the functions that use them and the numpy simulator runs without them.
+
+def pauli_operator(N, qubits, paulis, coeffs=1.0):
+    # Builds the SparsePauliOp sum_t coeffs[t] P_t on N qubits in a single allocation,
+    # where term t acts with the Pauli paulis[t][k] on qubit qubits[t][k].
+    # qubits: (n_terms, k) integer array, with distinct qubits within a term.
+    # paulis: a string of k letters from 'IXYZ' shared by all terms,
+    #         or an (n_terms, k) array of letters.
+    # coeffs: scalar or one coefficient per term.
+    from qiskit.quantum_info import PauliList, SparsePauliOp
+    qubits = np.asarray(qubits, dtype=np.intp)
+    qubits = qubits.reshape(len(qubits), -1)
+    letters = np.array(list(paulis)) if isinstance(paulis, str) else np.asarray(paulis)
+    letters = np.broadcast_to(letters, qubits.shape)
+    rows = np.repeat(np.arange(len(qubits)), qubits.shape[1])
+
+    # Symplectic representation: X -> x, Z -> z, Y -> x and z.
+    x = np.zeros((len(qubits), N), dtype=bool)
+    z = np.zeros((len(qubits), N), dtype=bool)
+    x[rows, qubits.ravel()] = np.isin(letters, ['X', 'Y']).ravel()
+    z[rows, qubits.ravel()] = np.isin(letters, ['Z', 'Y']).ravel()
+    coeffs = np.broadcast_to(np.asarray(coeffs, dtype=complex), (len(qubits),))
+    return SparsePauliOp(PauliList.from_symplectic(z, x), coeffs)
+
+def to_qubit_pauli_operator(op):
+    # Converts a qiskit SparsePauliOp to a pytket QubitPauliOperator
+    # (like qpo_from_sparsepauliop in the HEP notebook), reading qubit q
+    # from column q of the symplectic arrays.
+    from pytket import Qubit
+    from pytket.pauli import Pauli, QubitPauliString
+    from pytket.utils import QubitPauliOperator
+    paulis = np.array([Pauli.I, Pauli.X, Pauli.Z, Pauli.Y])[op.paulis.x + 2 * op.paulis.z]
+    terms = defaultdict(complex)
+    for x, z, row, coeff in zip(op.paulis.x, op.paulis.z, paulis, op.coeffs):
+        support = np.flatnonzero(x | z)
+        terms[QubitPauliString([Qubit(int(q)) for q in support], list(row[support]))] += coeff
+    return QubitPauliOperator(terms)
+
+def get_statevector(qc, noise_model=None, precision='single', initial_state=None, simulator=None):
+    # initial_state: statevector to start from instead of |0...0>
+    # simulator: 'numpy' for the in-process simulator in numpy_statevector.py, or 'aer'.
+    # Defaults to 'numpy', unless a noise_model is given, which needs Aer.
+    # Returns a numpy array with the numpy simulator and a qiskit Statevector with Aer,
+    # both work with np.asarray and the functions in numpy_statevector.py.
+    if _simulator(simulator, noise_model) == 'numpy':
+        return simulate(qc, initial_state, dtype=_DTYPES[precision])
+    from pytket.extensions.qiskit import tk_to_qiskit
+    return _run_statevector(_aer_statevector(precision), tk_to_qiskit(qc), noise_model, initial_state)
+
+_DTYPES = {'single': np.complex64, 'double': np.complex128}
+
+def _simulator(simulator, noise_model):
+    if simulator is None:
+        return 'numpy' if noise_model is None else 'aer'
+    if simulator == 'numpy' and noise_model is not None:
+        raise ValueError('The numpy simulator does not support noise models, use simulator=\'aer\'')
+    return simulator
+
+def _aer_statevector(precision):
+    from qiskit_aer import Aer
+    return Aer.get_backend('aer_simulator_statevector', precision = precision)
+
+def _run_statevector(sim_statevector, qc_qiskit, noise_model=None, initial_state=None):
+    from qiskit.quantum_info import Statevector
+    qc_temp = qc_qiskit.copy_empty_like()
+    if initial_state is not None:
+        state = np.asarray(initial_state, dtype=np.complex128)
+        qc_temp.set_statevector(state / np.linalg.norm(state))
+    qc_temp.compose(qc_qiskit, inplace=True)
+    qc_temp.save_statevector()
+    sv = sim_statevector.run(qc_temp, noise_model=noise_model, shots=1).result().data()['statevector']
+    return Statevector(sv)
+
+def evolve_statevector(qc, step, n_steps, noise_model=None, precision='single', simulator=None):
+    # Yields the statevector after qc and then after each of n_steps applications of step,
+    # i.e. the same states as get_statevector(qc), get_statevector(qc + step), ...
+    # Each step only simulates the new block, starting from the previous statevector,
+    # so n_steps steps cost n_steps step-simulations instead of n_steps*(n_steps+1)/2.
+    # The states are numpy arrays or qiskit Statevectors, as for get_statevector.
+    if _simulator(simulator, noise_model) == 'numpy':
+        # The step is compiled once and applied in place on a single buffer,
+        # of which each yielded state is a copy.
+        state = simulate(qc, dtype=_DTYPES[precision])
+        yield state.copy()
+        gates = compile_circuit(step)
+        for t in range(n_steps):
+            apply_gates(state, gates, qc.n_qubits)
+            yield state.copy()
+        return
+    from pytket.extensions.qiskit import tk_to_qiskit
+    sim_statevector = _aer_statevector(precision)
+    sv = _run_statevector(sim_statevector, tk_to_qiskit(qc), noise_model)
+    yield sv
+    step_qiskit = tk_to_qiskit(step)
+    for t in range(n_steps):
+        sv = _run_statevector(sim_statevector, step_qiskit, noise_model, initial_state=sv)
+        yield sv
+
+def evolve_statevector_batch(preparations, step, n_steps, precision='single'):
+    # Evolves the states prepared by each of the circuits in preparations with the same
+    # step, as the columns of one (2**N, len(preparations)) array, so that every gate of
+    # the step is applied once to the whole batch. Yields this array initially and after
+    # each of the n_steps steps. The array is updated in place, copy it to keep it.
+    states = np.stack([simulate(qc, dtype=_DTYPES[precision]) for qc in preparations], axis=1)
+    yield states
+    gates = compile_circuit(step)
+    for t in range(n_steps):
+        apply_gates(states, gates, preparations[0].n_qubits)
+        yield states
+
+def evolve_observables(qc, step, n_steps, observables, noise_model=None, precision='single', simulator=None):
+    # Like evolve_statevector, but yields a dict {name: real expectation value}
+    # for the operators in the dict observables.
+    from qiskit.quantum_info import Statevector
+    for sv in evolve_statevector(qc, step, n_steps, noise_model, precision, simulator):
+        sv = Statevector(sv)
+        yield {name: np.real(sv.expectation_value(op)) for name, op in observables.items()}
+
+def XYHamiltonian(couplings, J=-1.0):
+    # makes the qiskit SparsePauliOp that is the Hamiltonian
+    # J sum_<ij> (X_i X_j + Y_i Y_j) of the XY model
+    couplings = np.asarray(couplings)
+    N = int(couplings.max()) + 1
+    return pauli_operator(N, np.concatenate([couplings, couplings]),
+                          np.repeat([['X', 'X'], ['Y', 'Y']], len(couplings), axis=0), J)
+
+def Sx(N):
+    # makes the qiskit SparsePauliOperator that is sum of X on N qubits, divided by N
+    return pauli_operator(N, np.arange(N), 'X', 1 / N)
+
+def Sy(N):
+    # makes the qiskit SparsePauliOperator that is sum of Y on N qubits, divided by N
+    return pauli_operator(N, np.arange(N), 'Y', 1 / N)
+
+def XY_step(dt, couplings, n_layers=1, max_gates_per_layer=None):
+    # 2nd order Trotter step in XY model.
+    # couplings as returned by get_qubit_couplings are split into layers of disjoint
+    # couplings by schedule_couplings, with at most max_gates_per_layer gates each,
+    # and the gates are emitted layer by layer so that each layer runs in parallel.
+    # The layers returned by schedule_couplings may also be passed directly.
+    from tenpy_lattice_adapter import coupling_layers
+    layers = coupling_layers(couplings, max_gates_per_layer)
+    N = max(int(np.max(layer)) for layer in layers) + 1
+    qc = Circuit(N)
+
+    for t in range(n_layers):
+        for layer in layers:
+            for coupling in layer:
+                qc.YYPhase(dt/2 * 2/np.pi, coupling[0], coupling[1])
+        for layer in layers:
+            for coupling in layer:
+                qc.XXPhase(dt * 2/np.pi, coupling[0], coupling[1])
+        for layer in layers:
+            for coupling in layer:
+                qc.YYPhase(dt/2 * 2/np.pi, coupling[0], coupling[1])
+    return qc